@@ -1,33 +1,68 @@
+import hmac
+import os
 import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
 import pymysql
 from loguru import logger
+from pymysql.cursors import SSCursor
+
+from bulk_onboarding import USER_FIELDS, BulkResult, chunked
+from db_pool import LRUCache, ensure_column, ensure_index, get_pool
+from ledger_writer import LedgerWriter
+from log_config import configure_logging
+from pin_hash import DEFAULT_PIN_ITERATIONS, hash_pin, normalize_pin, verify_pin
+
+DOB_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+ACCOUNT_DETAIL_FIELDS = (
+    "name", "account_number", "phone_number", "balance", "ifsc_code", "cif", "gender", "dob", "occupation"
+)
+
+Statement = namedtuple(
+    "Statement", "user_id period_start period_end opening_balance closing_balance transactions"
+)
+
 
 class ATMSystem:
-    def __init__(self, host, user, password, db_name):
+    def __init__(self, host, user, password, db_name, pool_size=10, port=3306, ledger_batch_size=None,
+                 ledger_flush_interval=0.005, pin_iterations=DEFAULT_PIN_ITERATIONS, auth_cache_ttl=120,
+                 auth_cache_size=1024):
         self.db_name = db_name
         self.host = host
         self.user = user
         self.password = password
-        self.db_connection = self.connect_to_db()
-        self.cursor = self.db_connection.cursor()
-        self.create_tables()
-
-    def connect_to_db(self):
-        connection = pymysql.connect(
-            host=self.host, user=self.user, password=self.password
+        self.pool = get_pool(
+            host, user, password, db_name, schema=self.create_tables, max_size=pool_size, port=port
         )
-        cursor = connection.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name}")
-        cursor.execute(f"USE {self.db_name}")
-        connection.commit()
-        return connection
-
-    def create_tables(self):
-        self._create_users_table()
-        self._create_transactions_table()
-
-    def _create_users_table(self):
-        self.cursor.execute("""
+        self.pin_iterations = pin_iterations
+        # Successful logins are remembered for a short while, keyed by account, with a keyed
+        # digest of the PIN so a repeated login in the same session needs neither PBKDF2 nor the DB.
+        self.auth_cache = LRUCache(maxsize=auth_cache_size, ttl=auth_cache_ttl)
+        self._session_key = os.urandom(32)
+        # Group commit is opt-in: without a batch size every posting commits on its own.
+        self.ledger_writer = None
+        if ledger_batch_size:
+            self.ledger_writer = LedgerWriter(
+                self.pool, self._apply_balance, batch_size=ledger_batch_size, flush_interval=ledger_flush_interval
+            )
+
+    def close(self):
+        if self.ledger_writer:
+            self.ledger_writer.close()
+
+    def create_tables(self, cursor):
+        self._create_users_table(cursor)
+        self._add_pin_hash_columns(cursor)
+        self._create_transactions_table(cursor)
+        self._add_transaction_history_index(cursor)
+        self._create_balance_snapshots_table(cursor)
+
+    def _create_users_table(self, cursor):
+        cursor.execute("""
             CREATE TABLE IF NOT EXISTS Users (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 name VARCHAR(100),
@@ -42,10 +77,14 @@ class ATMSystem:
                 occupation VARCHAR(30) 
             )
         """)
-        self.db_connection.commit()
 
-    def _create_transactions_table(self):
-        self.cursor.execute("""
+    def _add_pin_hash_columns(self, cursor):
+        ensure_column(cursor, "Users", "pin_hash", "VARBINARY(32) NULL")
+        ensure_column(cursor, "Users", "pin_salt", "VARBINARY(16) NULL")
+        ensure_column(cursor, "Users", "pin_iterations", "INT NULL")
+
+    def _create_transactions_table(self, cursor):
+        cursor.execute("""
             CREATE TABLE IF NOT EXISTS Transactions (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 user_id INT,
@@ -55,13 +94,28 @@ class ATMSystem:
                 FOREIGN KEY (user_id) REFERENCES Users(id)
             )
         """)
-        self.db_connection.commit()
+
+    def _add_transaction_history_index(self, cursor):
+        # Serves keyset pagination of a user's history without a filesort.
+        ensure_index(cursor, "Transactions", "idx_transactions_user_time", "user_id, transaction_time, id")
+
+    def _create_balance_snapshots_table(self, cursor):
+        # A snapshot holds the balance made up of every transaction strictly before as_of.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS BalanceSnapshots (
+                user_id INT NOT NULL,
+                as_of DATETIME NOT NULL,
+                balance DECIMAL(12, 2) NOT NULL,
+                PRIMARY KEY (user_id, as_of),
+                FOREIGN KEY (user_id) REFERENCES Users(id)
+            )
+        """)
 
     def validate_phone_number(self, phone_number):
         return len(phone_number) in range(10, 13) and phone_number.isdigit()
 
     def validate_dob(self, dob):
-        return re.match(r"^\d{4}-\d{2}-\d{2}$", dob)
+        return DOB_PATTERN.match(dob)
 
     def format_gender(self, gender):
         valid_genders = {"male": "Male", "female": "Female", "other": "Other"}
@@ -84,50 +138,179 @@ class ATMSystem:
             logger.error("Gender must be Male, Female, or Other.")
             return None
 
+        account_number, ifsc_code, cif = self.account_identifiers(phone_number)
+        pin_salt, pin_hash = hash_pin(pin, self.pin_iterations)
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO Users (name, account_number, phone_number, pin_hash, pin_salt, pin_iterations, "
+                "ifsc_code, cif, gender, dob, occupation) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (name, account_number, phone_number, pin_hash, pin_salt, self.pin_iterations,
+                 ifsc_code, cif, gender, dob, occupation)
+            )
+            user_id = cursor.lastrowid
+        logger.info(
+            f"User created: {name}, Account Number: {account_number}, IFSC Code: {ifsc_code}, CIF: {cif}, DOB: {dob}")
+        return user_id, account_number
+
+    def account_identifiers(self, phone_number):
         account_number = "SBI0933" + phone_number[-6:]
         ifsc_code = "SBI0000933"
         cif = f"CIF{phone_number[-4:]}{account_number[-4:]}"
-        self.cursor.execute(
-            "INSERT INTO Users (name, account_number, phone_number, pin, ifsc_code, cif, gender, dob, occupation) "
-            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
-            (name, account_number, phone_number, pin, ifsc_code, cif, gender, dob, occupation)
-        )
-        self.db_connection.commit()
-        logger.info(
-            f"User created: {name}, Account Number: {account_number}, IFSC Code: {ifsc_code}, CIF: {cif}, DOB: {dob}")
-        return self.cursor.lastrowid, account_number
+        return account_number, ifsc_code, cif
+
+    def _user_record_error(self, record):
+        if not isinstance(record, dict):
+            return "Record must be an object of user fields."
+        missing = [field for field in USER_FIELDS if not record.get(field)]
+        if missing:
+            return f"Missing field(s): {', '.join(missing)}."
+        # JSONL may carry numbers or nulls; PINs and phone numbers must stay text to keep leading zeros.
+        not_text = [field for field in USER_FIELDS if not isinstance(record[field], str)]
+        if not_text:
+            return f"Field(s) must be strings: {', '.join(not_text)}."
+        if not self.validate_phone_number(record["phone_number"]):
+            return "Phone number must be between 10 and 12 digits."
+        if not self.validate_dob(record["dob"]):
+            return "Date of birth must be in the format YYYY-MM-DD."
+        if self.format_gender(record["gender"]) is None:
+            return "Gender must be Male, Female, or Other."
+        return None
+
+    def create_users_bulk(self, records, chunk_size=500, hash_workers=None):
+        """Onboard many users, yielding one ``BulkResult`` per input record in input order.
+
+        ``records`` may be any iterable of dicts, e.g. ``read_user_records(path)``;
+        it is consumed one chunk at a time so memory stays flat. Each chunk is
+        validated up front, checked for account_number/cif collisions within
+        itself and against the database in a single SELECT, PIN-hashed in
+        parallel, inserted with one ``executemany`` and committed once.
+        """
+        with ThreadPoolExecutor(max_workers=hash_workers) as hasher:
+            for offset, chunk in enumerate(chunked(records, chunk_size)):
+                yield from self._create_users_chunk(chunk, offset * chunk_size, hasher)
+
+    def _create_users_chunk(self, chunk, first_index, hasher):
+        errors = [self._user_record_error(record) for record in chunk]
+        identifiers = [
+            self.account_identifiers(record["phone_number"]) if error is None else None
+            for record, error in zip(chunk, errors)
+        ]
+
+        seen = set()
+        for position, ids in enumerate(identifiers):
+            if ids is None:
+                continue
+            account_number, _, cif = ids
+            if account_number in seen or cif in seen:
+                errors[position] = f"Duplicate account number or CIF in input: {account_number}."
+            seen.update((account_number, cif))
+
+        candidates = [ids for ids, error in zip(identifiers, errors) if error is None]
+        if candidates:
+            account_numbers = [ids[0] for ids in candidates]
+            cifs = [ids[2] for ids in candidates]
+            with self.pool.cursor() as cursor:
+                cursor.execute(
+                    "SELECT account_number, cif FROM Users WHERE account_number IN %s OR cif IN %s",
+                    (account_numbers, cifs)
+                )
+                taken = {value for row in cursor.fetchall() for value in row}
+            for position, ids in enumerate(identifiers):
+                if errors[position] is None and (ids[0] in taken or ids[2] in taken):
+                    errors[position] = f"Account number or CIF already exists: {ids[0]}."
+
+        accepted = [position for position, error in enumerate(errors) if error is None]
+        hashes = list(hasher.map(lambda position: hash_pin(chunk[position]["pin"], self.pin_iterations), accepted))
+        rows = []
+        for position, (pin_salt, pin_hash) in zip(accepted, hashes):
+            record = chunk[position]
+            account_number, ifsc_code, cif = identifiers[position]
+            rows.append((
+                record["name"], account_number, record["phone_number"], pin_hash, pin_salt, self.pin_iterations,
+                ifsc_code, cif, self.format_gender(record["gender"]), record["dob"], record["occupation"]
+            ))
+        if rows:
+            try:
+                with self.pool.cursor() as cursor:
+                    cursor.executemany(
+                        "INSERT INTO Users (name, account_number, phone_number, pin_hash, pin_salt, pin_iterations, "
+                        "ifsc_code, cif, gender, dob, occupation) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                        rows
+                    )
+            except pymysql.Error as e:
+                logger.error(f"Bulk insert of {len(rows)} users failed, chunk rolled back: {e}")
+                for position in accepted:
+                    errors[position] = f"Insert failed: {e}"
+
+        created = sum(error is None for error in errors)
+        logger.info(f"Onboarded {created} of {len(chunk)} users starting at record {first_index}.")
+        for position, error in enumerate(errors):
+            account_number = identifiers[position][0] if identifiers[position] else None
+            yield BulkResult(first_index + position, account_number, error is None, error)
 
     def authenticate_user(self, account_number, pin):
-        self.cursor.execute(
-            "SELECT * FROM Users WHERE account_number = %s AND pin = %s", (account_number, pin)
+        """Return ``(user_id, name)`` when the PIN matches, otherwise None."""
+        session_digest = hmac.new(
+            self._session_key, f"{account_number}:{normalize_pin(pin)}".encode(), "sha256"
+        ).digest()
+        cached = self.auth_cache.get(account_number)
+        if cached and hmac.compare_digest(cached[1], session_digest):
+            return cached[0]
+
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, name, pin, pin_hash, pin_salt, pin_iterations FROM Users WHERE account_number = %s",
+                (account_number,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            user_id, name, legacy_pin, pin_hash, pin_salt, pin_iterations = row
+            if pin_hash is None:
+                # Accounts created before PIN hashing still carry the plain INT pin.
+                if legacy_pin is None or not normalize_pin(pin).isdigit() or int(pin) != legacy_pin:
+                    return None
+            elif not verify_pin(pin, pin_salt, pin_hash, pin_iterations):
+                return None
+            if pin_hash is None or pin_iterations != self.pin_iterations:
+                self._rehash_pin(cursor, user_id, pin)
+
+        user = (user_id, name)
+        self.auth_cache.put(account_number, (user, session_digest))
+        return user
+
+    def _rehash_pin(self, cursor, user_id, pin):
+        pin_salt, pin_hash = hash_pin(pin, self.pin_iterations)
+        cursor.execute(
+            "UPDATE Users SET pin = NULL, pin_hash = %s, pin_salt = %s, pin_iterations = %s WHERE id = %s",
+            (pin_hash, pin_salt, self.pin_iterations, user_id)
         )
-        return self.cursor.fetchone()
+
+    def logout(self, account_number):
+        self.auth_cache.invalidate(account_number)
 
     def check_balance(self, user_id):
-        self.cursor.execute("SELECT balance FROM Users WHERE id = %s", (user_id,))
-        balance = self.cursor.fetchone()[0]
-        logger.info(f"Balance for User ID {user_id}: Rs. {balance}")
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT balance FROM Users WHERE id = %s", (user_id,))
+            balance = cursor.fetchone()[0]
+        logger.info("Balance for User ID {user_id}: Rs. {balance}", user_id=user_id, balance=balance)
         return balance
 
     def view_account_details(self, user_id):
-        self.cursor.execute("""
-            SELECT name, account_number, phone_number, balance, ifsc_code, cif, gender, dob, occupation
-            FROM Users
-            WHERE id = %s
-        """, (user_id,))
-        account_details = self.cursor.fetchone()
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(ACCOUNT_DETAIL_FIELDS)} FROM Users WHERE id = %s", (user_id,)
+            )
+            account_details = cursor.fetchone()
 
         if account_details:
-            logger.info(f"Account Details for User ID {user_id}:")
-            logger.info(f"Name: {account_details[0]}")
-            logger.info(f"Account Number: {account_details[1]}")
-            logger.info(f"Phone Number: {account_details[2]}")
-            logger.info(f"Balance: Rs. {account_details[3]}")
-            logger.info(f"IFSC Code: {account_details[4]}")
-            logger.info(f"CIF: {account_details[5]}")
-            logger.info(f"Gender: {account_details[6]}")
-            logger.info(f"Date of Birth: {account_details[7]}")
-            logger.info(f"Occupation: {account_details[8]}")
+            # One structured record instead of a log call per field.
+            logger.info(
+                "Account Details for User ID {user_id}: Name: {name}, Account Number: {account_number}, "
+                "Phone Number: {phone_number}, Balance: Rs. {balance}, IFSC Code: {ifsc_code}, CIF: {cif}, "
+                "Gender: {gender}, Date of Birth: {dob}, Occupation: {occupation}",
+                user_id=user_id, **dict(zip(ACCOUNT_DETAIL_FIELDS, account_details))
+            )
             return account_details
         else:
             logger.error("Account details not found.")
@@ -140,10 +323,10 @@ class ATMSystem:
         while attempts < max_attempts:
             if 1.00 <= amount <= 99999999.99:
                 # Valid amount, proceed with the deposit
-                self.cursor.execute("UPDATE Users SET balance = balance + %s WHERE id = %s", (amount, user_id))
-                self.db_connection.commit()
-                self.save_transaction(user_id, 'Deposit', amount)
-                logger.info(f"Deposited Rs. {amount} to User ID {user_id}")
+                if not self.post_transaction(user_id, 'Deposit', amount):
+                    logger.error("Deposit failed: User ID {user_id} not found.", user_id=user_id)
+                    return False
+                logger.info("Deposited Rs. {amount} to User ID {user_id}", amount=amount, user_id=user_id)
                 return True
             else:
                 # Invalid amount, log an error and prompt again
@@ -158,45 +341,213 @@ class ATMSystem:
         return False
 
     def withdraw(self, user_id, amount):
-        current_balance = self.check_balance(user_id)
-        if amount > 0 and current_balance >= amount:
-            self.cursor.execute("UPDATE Users SET balance = balance - %s WHERE id = %s", (amount, user_id))
-            self.db_connection.commit()
-            self.save_transaction(user_id, 'Withdraw', amount)
-            logger.info(f"Withdraw Rs. {amount} from User ID {user_id}")
+        if amount > 0 and self.post_transaction(user_id, 'Withdraw', amount):
+            logger.info("Withdraw Rs. {amount} from User ID {user_id}", amount=amount, user_id=user_id)
             return True
         else:
             logger.error("Insufficient balance or invalid withdrawal amount.")
             return False
 
-    def save_transaction(self, user_id, transaction_type, amount):
-        self.cursor.execute(
+    def post_transaction(self, user_id, transaction_type, amount):
+        """Move the balance and record the ledger row in one transaction.
+
+        Withdrawals only touch the row while ``balance >= amount``, so the
+        affected row count tells us whether the posting went through and two
+        concurrent withdrawals can never overdraw the account.
+        """
+        if self.ledger_writer:
+            return self.ledger_writer.submit(user_id, transaction_type, amount).result()
+        with self.pool.cursor() as cursor:
+            return self._post_transaction(cursor, user_id, transaction_type, amount)
+
+    def _post_transaction(self, cursor, user_id, transaction_type, amount):
+        if not self._apply_balance(cursor, user_id, transaction_type, amount):
+            return False
+        cursor.execute(
             "INSERT INTO Transactions (user_id, type, amount) VALUES (%s, %s, %s)",
             (user_id, transaction_type, amount)
         )
-        self.db_connection.commit()
-        logger.info(f"Transaction saved: {transaction_type} of Rs. {amount}")
+        logger.info(
+            "Transaction saved: {transaction_type} of Rs. {amount}",
+            user_id=user_id, transaction_type=transaction_type, amount=amount, sample="transaction"
+        )
+        return True
+
+    def _apply_balance(self, cursor, user_id, transaction_type, amount):
+        if transaction_type == 'Withdraw':
+            cursor.execute(
+                "UPDATE Users SET balance = balance - %s WHERE id = %s AND balance >= %s",
+                (amount, user_id, amount)
+            )
+        else:
+            cursor.execute("UPDATE Users SET balance = balance + %s WHERE id = %s", (amount, user_id))
+        return cursor.rowcount == 1
+
+    def save_transaction(self, user_id, transaction_type, amount):
+        if self.ledger_writer:
+            self.ledger_writer.submit(user_id, transaction_type, amount, apply_balance=False).result()
+        else:
+            with self.pool.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO Transactions (user_id, type, amount) VALUES (%s, %s, %s)",
+                    (user_id, transaction_type, amount)
+                )
+        logger.info(
+            "Transaction saved: {transaction_type} of Rs. {amount}",
+            user_id=user_id, transaction_type=transaction_type, amount=amount, sample="transaction"
+        )
 
-    def view_transaction_history(self, user_id):
-        self.cursor.execute("SELECT type, amount, transaction_time FROM Transactions WHERE user_id = %s", (user_id,))
-        transactions = self.cursor.fetchall()
+    def transaction_history_page(self, user_id, after=None, start=None, end=None, limit=50):
+        """Return up to ``limit`` rows of ``(id, type, amount, transaction_time)``, oldest first.
+
+        ``after`` is the ``(transaction_time, id)`` key of the last row of the
+        previous page; ``start`` and ``end`` bound ``transaction_time`` as a
+        half-open range. Each page is a range read on idx_transactions_user_time.
+        """
+        return list(self._stream_history(user_id, after, start, end, limit))
+
+    def iter_transaction_history(self, user_id, start=None, end=None, page_size=500):
+        """Stream a user's full history page by page, holding at most one page in memory."""
+        after = None
+        while True:
+            count = 0
+            for row in self._stream_history(user_id, after, start, end, page_size):
+                count += 1
+                after = (row[3], row[0])
+                yield row
+            if count < page_size:
+                return
+
+    def _stream_history(self, user_id, after, start, end, limit):
+        query = "SELECT id, type, amount, transaction_time FROM Transactions WHERE user_id = %s"
+        params = [user_id]
+        if start is not None:
+            query += " AND transaction_time >= %s"
+            params.append(start)
+        if end is not None:
+            query += " AND transaction_time < %s"
+            params.append(end)
+        if after is not None:
+            query += " AND (transaction_time > %s OR (transaction_time = %s AND id > %s))"
+            params.extend((after[0], after[0], after[1]))
+        query += " ORDER BY transaction_time, id LIMIT %s"
+        params.append(limit)
+        with self.pool.cursor(SSCursor) as cursor:
+            cursor.execute(query, params)
+            yield from cursor
+
+    def view_transaction_history(self, user_id, start=None, end=None):
+        """Log and return the history as a list of ``(type, amount, transaction_time)`` rows.
+
+        The whole history is held in memory; use ``iter_transaction_history()``
+        to stream large histories instead.
+        """
+        transactions = []
+        for _, transaction_type, amount, transaction_time in self.iter_transaction_history(user_id, start, end):
+            logger.info("{transaction_time} - {transaction_type}: Rs. {amount}", transaction_time=transaction_time,
+                        transaction_type=transaction_type, amount=amount)
+            transactions.append((transaction_type, amount, transaction_time))
 
         # Fetch the current balance for the user
-        self.cursor.execute("SELECT balance FROM Users WHERE id = %s", (user_id,))
-        balance_result = self.cursor.fetchone()
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT balance FROM Users WHERE id = %s", (user_id,))
+            balance_result = cursor.fetchone()
         balance = balance_result[0] if balance_result else 0
 
-        for transaction in transactions:
-            logger.info(f"{transaction[2]} - {transaction[0]}: Rs. {transaction[1]}")
-
         # Display the balance at the end of transaction history
-        logger.info(f"Current Balance: Rs. {balance}")
+        logger.info("Current Balance: Rs. {balance}", user_id=user_id, balance=balance)
 
         return transactions
 
+    def balance_at(self, user_id, ts):
+        """Balance after every transaction strictly before ``ts``.
+
+        Reads the newest snapshot at or before ``ts`` and sums only the ledger
+        rows between it and ``ts``, instead of the user's whole history.
+        """
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT as_of, balance FROM BalanceSnapshots WHERE user_id = %s AND as_of <= %s "
+                "ORDER BY as_of DESC LIMIT 1",
+                (user_id, ts)
+            )
+            snapshot = cursor.fetchone()
+            query = (
+                "SELECT COALESCE(SUM(IF(type = 'Deposit', amount, -amount)), 0) FROM Transactions "
+                "WHERE user_id = %s AND transaction_time < %s"
+            )
+            params = [user_id, ts]
+            if snapshot:
+                query += " AND transaction_time >= %s"
+                params.append(snapshot[0])
+            cursor.execute(query, params)
+            delta = cursor.fetchone()[0]
+        opening = snapshot[1] if snapshot else Decimal("0.00")
+        return opening + delta
+
+    def checkpoint_balances(self, as_of):
+        """Write a snapshot at ``as_of`` for every user with activity since their previous one.
+
+        Idle accounts are skipped; ``balance_at`` simply falls back to their
+        older snapshot. Returns the number of snapshots written.
+        """
+        with self.pool.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO BalanceSnapshots (user_id, as_of, balance)
+                SELECT closing.user_id, %(as_of)s, closing.balance FROM (
+                    SELECT u.id AS user_id,
+                           COALESCE(s.balance, 0) + SUM(IF(t.type = 'Deposit', t.amount, -t.amount)) AS balance
+                    FROM Users u
+                    LEFT JOIN BalanceSnapshots s ON s.user_id = u.id AND s.as_of = (
+                        SELECT MAX(p.as_of) FROM BalanceSnapshots p WHERE p.user_id = u.id AND p.as_of < %(as_of)s
+                    )
+                    JOIN Transactions t ON t.user_id = u.id AND t.transaction_time < %(as_of)s
+                        AND (s.as_of IS NULL OR t.transaction_time >= s.as_of)
+                    GROUP BY u.id, s.balance
+                ) AS closing
+                ON DUPLICATE KEY UPDATE balance = closing.balance
+            """, {"as_of": as_of})
+            written = cursor.rowcount
+        logger.info(f"Balance checkpoint at {as_of}: {written} snapshot(s) written.")
+        return written
+
+    def backfill_balance_snapshots(self, start=None, end=None, interval=timedelta(days=1)):
+        """Checkpoint every ``interval`` from ``start`` up to ``end`` (default: today at midnight).
+
+        Each checkpoint commits on its own, oldest first, so each one builds on
+        the snapshot written just before it.
+        """
+        if start is None:
+            with self.pool.cursor() as cursor:
+                cursor.execute("SELECT MIN(transaction_time) FROM Transactions")
+                first = cursor.fetchone()[0]
+            if first is None:
+                return 0
+            start = datetime.combine(first.date(), datetime.min.time()) + timedelta(days=1)
+        if end is None:
+            end = datetime.combine(date.today(), datetime.min.time())
+        checkpoints = 0
+        as_of = start
+        while as_of <= end:
+            self.checkpoint_balances(as_of)
+            checkpoints += 1
+            as_of += interval
+        return checkpoints
+
+    def monthly_statement(self, user_id, year, month):
+        period_start = datetime(year, month, 1)
+        period_end = datetime(year + month // 12, month % 12 + 1, 1)
+        opening = self.balance_at(user_id, period_start)
+        transactions = list(self.iter_transaction_history(user_id, period_start, period_end))
+        closing = opening
+        for _, transaction_type, amount, _ in transactions:
+            closing += amount if transaction_type == 'Deposit' else -amount
+        return Statement(user_id, period_start, period_end, opening, closing, transactions)
+
 
 # Main function for interaction
 if __name__ == "__main__":
+    configure_logging()
     logger.info("Welcome to the SBI Bank ATM System")
 
     # Get database connection details from the user
@@ -210,7 +561,7 @@ if __name__ == "__main__":
 
     # User authentication
     account_number = input("Enter your account number: ")
-    pin = int(input("Enter your PIN: "))
+    pin = input("Enter your PIN: ")
 
     # Authenticate user or create a new one if not found
     user = atm.authenticate_user(account_number, pin)
@@ -258,6 +609,7 @@ if __name__ == "__main__":
         elif choice == '5':
             atm.view_account_details(user_id)
         elif choice == '6':
+            atm.close()
             logger.success("Thank you for using the ATM system!")
             break
         else:
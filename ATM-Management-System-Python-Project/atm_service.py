@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from loguru import logger
+
+from atm_app import ATMSystem
+from db_pool import LRUCache
+from log_config import configure_logging
+
+
+class ATMService:
+    """Serve many ATM terminals from one process over newline-delimited JSON.
+
+    Each connection is a session: it must log in first and may then send
+    ``check_balance``, ``deposit``, ``withdraw``, ``history`` and ``logout``
+    requests, one JSON object per line, e.g. ``{"op": "deposit", "amount": 500}``.
+    Database work is offloaded to a thread pool sized like the connection pool,
+    so the event loop never blocks on MySQL. Sessions are dropped after
+    ``idle_timeout`` seconds without a request, and a read-only request fails
+    after ``request_timeout`` seconds.
+
+    ``deposit`` and ``withdraw`` are never timed out, since the worker thread
+    would still commit after the client had been told otherwise. They may
+    carry a ``request_id``: a retry with the same id gets the first attempt's
+    outcome (waiting for it if it is still running) instead of moving the
+    money twice. The last ``idempotency_cache_size`` ids are remembered in
+    this process.
+    """
+
+    def __init__(self, atm, workers=10, idle_timeout=120.0, request_timeout=10.0, idempotency_cache_size=10000):
+        self.atm = atm
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="atm-db")
+        self.idle_timeout = idle_timeout
+        self.request_timeout = request_timeout
+        self.completed = LRUCache(maxsize=idempotency_cache_size)  # (user_id, request_id) -> result
+        self.in_flight = {}  # (user_id, request_id) -> future of the running attempt
+        self.handlers = {
+            "login": self.handle_login,
+            "check_balance": self.handle_check_balance,
+            "deposit": self.handle_deposit,
+            "withdraw": self.handle_withdraw,
+            "history": self.handle_history,
+            "logout": self.handle_logout,
+        }
+
+    async def call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.executor, func, *args), self.request_timeout)
+
+    async def call_mutation(self, session, request, func, *args):
+        """Run a money-moving call to completion, at most once per ``request_id``."""
+        loop = asyncio.get_running_loop()
+        request_id = request.get("request_id")
+        if request_id is None:
+            return await loop.run_in_executor(self.executor, func, *args)
+        key = (session["user_id"], str(request_id))
+        result = self.completed.get(key)
+        if result is not None:
+            logger.info("Replaying request {request_id}", request_id=request_id, sample="idempotent_replay")
+            return result
+        future = self.in_flight.get(key)
+        if future is None:
+            future = loop.run_in_executor(self.executor, func, *args)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        # A retry joins the running attempt; shielding keeps one waiter's cancellation from cancelling it.
+        return await asyncio.shield(future)
+
+    def _finish(self, key, future):
+        self.in_flight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.completed.put(key, future.result())
+
+    async def handle_session(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        session = {"user_id": None, "account_number": None}
+        logger.debug("Session opened from {peer}", peer=peer, sample="session")
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    await self.send(writer, {"ok": False, "error": "Session timed out."})
+                    break
+                if not line:
+                    break
+                response = await self.dispatch(session, line)
+                await self.send(writer, response)
+                if response.get("closed"):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.debug("Client {peer} disconnected: {error}", peer=peer, error=str(e), sample="session")
+        finally:
+            if session["account_number"]:
+                self.atm.logout(session["account_number"])
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass  # the peer is already gone
+            logger.debug("Session closed from {peer}", peer=peer, sample="session")
+
+    async def dispatch(self, session, line):
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+            handler = self.handlers.get(op)
+            if handler is None:
+                return {"ok": False, "error": f"Unknown operation: {op}"}
+            if op != "login" and session["user_id"] is None:
+                return {"ok": False, "error": "Please log in first."}
+            return await handler(session, request)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": "Request timed out."}
+        except (ValueError, TypeError, KeyError) as e:
+            return {"ok": False, "error": f"Bad request: {e}"}
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            return {"ok": False, "error": "Internal error."}
+
+    @staticmethod
+    async def send(writer, response):
+        writer.write(json.dumps(response, default=str).encode() + b"\n")
+        await writer.drain()
+
+    async def handle_login(self, session, request):
+        user = await self.call(self.atm.authenticate_user, request["account_number"], str(request["pin"]))
+        if user is None:
+            return {"ok": False, "error": "Invalid account number or PIN."}
+        session["user_id"], session["account_number"] = user[0], request["account_number"]
+        return {"ok": True, "user_id": user[0], "name": user[1]}
+
+    async def handle_check_balance(self, session, request):
+        return {"ok": True, "balance": await self.call(self.atm.check_balance, session["user_id"])}
+
+    async def handle_deposit(self, session, request):
+        amount = float(request["amount"])
+        # Validated here because ATMSystem.deposit() falls back to input() on a bad amount.
+        if not 1.00 <= amount <= 99999999.99:
+            return {"ok": False, "error": "Deposit amount must be between Rs. 1.00 and Rs. 99999999.99."}
+        return {"ok": await self.call_mutation(session, request, self.atm.deposit, session["user_id"], amount)}
+
+    async def handle_withdraw(self, session, request):
+        ok = await self.call_mutation(session, request, self.atm.withdraw, session["user_id"], float(request["amount"]))
+        return {"ok": ok} if ok else {"ok": False, "error": "Insufficient balance or invalid withdrawal amount."}
+
+    async def handle_history(self, session, request):
+        after = request.get("after")
+        if after:
+            after = (datetime.fromisoformat(after[0]), int(after[1]))
+        limit = min(int(request.get("limit", 50)), 500)
+        rows = await self.call(
+            self.atm.transaction_history_page, session["user_id"], after,
+            request.get("start"), request.get("end"), limit
+        )
+        transactions = [
+            {"id": row[0], "type": row[1], "amount": row[2], "time": row[3].isoformat()} for row in rows
+        ]
+        next_after = [rows[-1][3].isoformat(), rows[-1][0]] if len(rows) == limit else None
+        return {"ok": True, "transactions": transactions, "next": next_after}
+
+    async def handle_logout(self, session, request):
+        return {"ok": True, "closed": True}
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_session, host, port)
+        logger.info(f"ATM service listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ATM system as a multi-session JSON-lines service.")
+    parser.add_argument("--listen-host", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=8765)
+    parser.add_argument("--host", default="localhost", help="Database host.")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("ATM_DB_PASSWORD", ""))
+    parser.add_argument("--db-name", default="atm_db")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--idle-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    configure_logging()
+
+    atm = ATMSystem(args.host, args.user, args.password, args.db_name, pool_size=args.pool_size)
+    service = ATMService(atm, workers=args.pool_size, idle_timeout=args.idle_timeout)
+    try:
+        asyncio.run(service.serve(args.listen_host, args.listen_port))
+    except KeyboardInterrupt:
+        logger.info("ATM service stopped.")
+    finally:
+        atm.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import argparse
+import os
+from datetime import date, datetime
+
+from loguru import logger
+
+from atm_app import ATMSystem
+from log_config import configure_logging
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write daily balance snapshots for the ATM database.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("ATM_DB_PASSWORD", ""))
+    parser.add_argument("--db-name", default="atm_db")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Checkpoint every day since the first transaction instead of only today.")
+    args = parser.parse_args()
+    configure_logging()
+
+    atm = ATMSystem(args.host, args.user, args.password, args.db_name)
+    if args.backfill:
+        checkpoints = atm.backfill_balance_snapshots()
+        logger.success(f"Backfilled {checkpoints} daily checkpoint(s).")
+    else:
+        atm.checkpoint_balances(datetime.combine(date.today(), datetime.min.time()))
+    atm.close()
+
+
+if __name__ == "__main__":
+    main()
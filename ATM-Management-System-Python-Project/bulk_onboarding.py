@@ -0,0 +1,29 @@
+import csv
+import json
+from collections import namedtuple
+
+USER_FIELDS = ("name", "phone_number", "pin", "gender", "dob", "occupation")
+
+BulkResult = namedtuple("BulkResult", "index account_number created error")
+
+
+def read_user_records(path):
+    """Stream onboarding records from a CSV (with a header row) or JSONL file, one dict at a time."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.endswith(".jsonl"):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,114 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from loguru import logger
+
+_STOP = object()
+
+
+class LedgerWriter:
+    """Group-commit writer for the Transactions ledger.
+
+    Postings are buffered and flushed by a background thread, either when
+    ``batch_size`` postings are waiting or ``flush_interval`` seconds after the
+    first one arrived. Each batch runs its balance updates, one multi-row
+    ``executemany`` INSERT and a single commit. ``submit()`` returns a Future
+    that resolves only after that commit, so a ``True`` result is a durability
+    acknowledgement.
+    """
+
+    def __init__(self, pool, apply_balance, batch_size=100, flush_interval=0.005, max_pending=None):
+        self.pool = pool
+        self.apply_balance = apply_balance
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending or batch_size * 10)
+        self._closed = False
+        self._lock = threading.Lock()  # orders submit() against close(), so nothing is queued behind _STOP
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, user_id, transaction_type, amount, apply_balance=True):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Ledger writer is closed.")
+            self._queue.put((user_id, transaction_type, amount, apply_balance, future))
+        return future
+
+    def close(self):
+        """Flush everything still buffered and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+        # Only reachable if the writer thread died; never leave a caller waiting on an unresolved future.
+        while True:
+            try:
+                posting = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if posting is not _STOP and not posting[-1].done():
+                posting[-1].set_exception(RuntimeError("Ledger writer closed before the posting was written."))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            posting = self._queue.get()
+            if posting is _STOP:
+                break
+            batch = [posting]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    posting = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if posting is _STOP:
+                    stopping = True
+                    break
+                batch.append(posting)
+            self._flush(batch)
+        leftovers = []
+        while True:
+            try:
+                posting = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if posting is not _STOP:
+                leftovers.append(posting)
+        if leftovers:
+            self._flush(leftovers)
+
+    def _flush(self, batch):
+        results = []
+        rows = []
+        try:
+            with self.pool.cursor() as cursor:
+                for user_id, transaction_type, amount, apply_balance, _ in batch:
+                    accepted = not apply_balance or self.apply_balance(cursor, user_id, transaction_type, amount)
+                    results.append(accepted)
+                    if accepted:
+                        rows.append((user_id, transaction_type, amount))
+                if rows:
+                    cursor.executemany(
+                        "INSERT INTO Transactions (user_id, type, amount) VALUES (%s, %s, %s)", rows
+                    )
+        except Exception as e:
+            logger.error(f"Ledger batch of {len(batch)} postings failed and was rolled back: {e}")
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+        for (*_, future), accepted in zip(batch, results):
+            future.set_result(accepted)
+        logger.debug(
+            "Ledger batch committed: {accepted} of {size} postings accepted.",
+            accepted=len(rows), size=len(batch), sample="ledger_batch"
+        )
@@ -0,0 +1,24 @@
+import hashlib
+import hmac
+import os
+
+# PBKDF2-SHA256 rounds for new hashes. Each user row stores the count it was
+# hashed with, so this can be tuned to the login latency budget at any time and
+# older hashes are upgraded the next time their owner logs in.
+DEFAULT_PIN_ITERATIONS = 60000
+
+
+def normalize_pin(pin):
+    return str(pin).strip()
+
+
+def hash_pin(pin, iterations=DEFAULT_PIN_ITERATIONS, salt=None):
+    """Return ``(salt, digest)`` for ``pin``; a fresh 16-byte salt is drawn unless one is given."""
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", normalize_pin(pin).encode(), salt, iterations)
+    return salt, digest
+
+
+def verify_pin(pin, salt, expected_digest, iterations):
+    _, digest = hash_pin(pin, iterations, salt)
+    return hmac.compare_digest(digest, expected_digest)
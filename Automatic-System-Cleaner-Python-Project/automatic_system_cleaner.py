@@ -1,20 +1,16 @@
 from loguru import logger
 import os
-import shutil
+
+from directory_scanner import tree_size
+from tree_cleaner import clear_tree, clear_trees
 
 # Configure Loguru
 logger.add("system_cleaner.log", format="{time} {level} {message}", level="INFO", rotation="10 MB", compression="zip")
 
 
-def get_directory_size(directory):
+def get_directory_size(directory, workers=None):
     """Calculate the total size of files in a directory."""
-    total_size = 0
-    for dirpath, dirnames, filenames in os.walk(directory):
-        for file in filenames:
-            filepath = os.path.join(dirpath, file)
-            if os.path.isfile(filepath):
-                total_size += os.path.getsize(filepath)
-    return total_size
+    return tree_size(directory, workers)[1]
 
 
 def clear_directory(directory):
@@ -23,42 +19,10 @@ def clear_directory(directory):
         logger.warning(f"Directory {directory} does not exist.")
         return 0
 
-    cleared_size = 0
-
-    for dirpath, dirnames, filenames in os.walk(directory):
-        for file in filenames:
-            filepath = os.path.join(dirpath, file)
-            try:
-                if os.path.isfile(filepath):
-                    cleared_size += os.path.getsize(filepath)
-                    os.remove(filepath)
-            except PermissionError:
-                logger.warning(f"Permission denied: {filepath}")
-            except OSError as e:
-                if e.errno == 32:  # File in use
-                    logger.warning(f"File in use, skipping: {filepath}")
-                else:
-                    logger.error(f"Failed to delete file {filepath}: {e}")
-            except Exception as e:
-                logger.error(f"Unexpected error deleting file {filepath}: {e}")
-
-        for dirname in dirnames:
-            dirpath = os.path.join(directory, dirname)
-            try:
-                shutil.rmtree(dirpath)
-                cleared_size += get_directory_size(dirpath)
-            except PermissionError:
-                logger.warning(f"Permission denied: {dirpath}")
-            except OSError as e:
-                if e.errno == 32:  # Directory in use
-                    logger.warning(f"Directory in use, skipping: {dirpath}")
-                else:
-                    logger.error(f"Failed to delete directory {dirpath}: {e}")
-            except Exception as e:
-                logger.error(f"Unexpected error deleting directory {dirpath}: {e}")
-
-    logger.info(f"Cleared {cleared_size / (1024 ** 2):.2f} MB from {directory}.")
-    return cleared_size
+    result = clear_tree(directory)
+    logger.info(f"Cleared {result.bytes_freed / (1024 ** 2):.2f} MB from {directory} "
+                f"({result.files_removed} files, {result.dirs_removed} directories, {result.errors} skipped).")
+    return result.bytes_freed
 
 
 def main():
@@ -69,15 +33,16 @@ def main():
         os.path.expanduser("~/.cache")  # User cache directory
     ]
 
+    logger.info(f"Cleaning {', '.join(directories_to_clean)}...")
+
+    # The roots are independent, so they are cleaned concurrently.
     total_space_cleared = 0
-    for directory in directories_to_clean:
-        logger.info(f"Cleaning {directory}...")
-        space_cleared = clear_directory(directory)
-        if space_cleared > 0:
-            logger.info(f"Cleared {space_cleared / (1024 ** 2):.2f} MB from {directory}.")
-            total_space_cleared += space_cleared
+    for result in clear_trees(directories_to_clean):
+        if result.bytes_freed > 0:
+            logger.info(f"Cleared {result.bytes_freed / (1024 ** 2):.2f} MB from {result.root}.")
+            total_space_cleared += result.bytes_freed
         else:
-            logger.info(f"No space cleared from {directory}.")
+            logger.info(f"No space cleared from {result.root}.")
 
     logger.info(f"Total space cleared: {total_space_cleared / (1024 ** 2):.2f} MB.")
 
@@ -0,0 +1,80 @@
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from loguru import logger
+
+# size/mtime come from the DirEntry's own stat; directories carry size 0 and no mtime.
+ScanEntry = namedtuple("ScanEntry", "path size mtime is_dir")
+
+
+def default_workers():
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def scan_directory(path):
+    """List one directory with a single ``os.scandir`` pass.
+
+    Returns ``(path, files, subdirectories)``. File types come from the
+    directory listing itself and each non-directory costs exactly one
+    ``lstat`` (none on Windows, where ``scandir`` already has it). Symlinks
+    are reported, never followed.
+    """
+    files, subdirectories = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    else:
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append(ScanEntry(entry.path, stat.st_size, stat.st_mtime, False))
+                except FileNotFoundError:
+                    continue  # removed between the listing and the stat
+                except OSError as e:
+                    logger.warning(f"Cannot stat {entry.path}: {e}")
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        logger.warning(f"Permission denied: {path}")
+    except OSError as e:
+        logger.error(f"Failed to scan {path}: {e}")
+    return path, files, subdirectories
+
+
+def iter_tree(root, workers=None, include_dirs=False, max_pending=None):
+    """Yield a ``ScanEntry`` for every file under ``root``, scanning subtrees concurrently.
+
+    Directories are listed on a thread pool (``os.scandir`` releases the GIL
+    while it waits on the filesystem), at most ``max_pending`` at a time.
+    Directories still to be listed wait on a stack, so the walk stays close to
+    depth-first and memory holds only that frontier plus the listings in
+    flight, however big the tree. Entries arrive in no particular order. With
+    ``include_dirs`` each directory is yielded too, right after its own
+    listing.
+    """
+    workers = workers or default_workers()
+    max_pending = max_pending or workers * 2
+    todo = [root]
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as executor:
+        while todo or pending:
+            while todo and len(pending) < max_pending:
+                pending.add(executor.submit(scan_directory, todo.pop()))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, files, subdirectories = future.result()
+                todo.extend(subdirectories)
+                yield from files
+                if include_dirs:
+                    yield ScanEntry(path, 0, None, True)
+
+
+def tree_size(root, workers=None):
+    """``(file_count, total_bytes)`` for everything under ``root``."""
+    count = total = 0
+    for entry in iter_tree(root, workers):
+        count += 1
+        total += entry.size
+    return count, total
@@ -0,0 +1,150 @@
+import errno
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+CleanResult = namedtuple("CleanResult", "root files_removed dirs_removed bytes_freed errors")
+
+# Unlinking relative to an open directory descriptor needs these; Windows has none of them.
+SUPPORTS_DIR_FD = (
+    {os.open, os.unlink, os.rmdir} <= os.supports_dir_fd
+    and os.scandir in os.supports_fd
+)
+_ROOT_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+# The root may itself be a symlink (/tmp is one on macOS); only what lies below it must never be followed.
+_DIR_FLAGS = _ROOT_FLAGS | getattr(os, "O_NOFOLLOW", 0)
+
+
+def _log_failure(path, e):
+    if isinstance(e, PermissionError):
+        logger.warning(f"Permission denied: {path}")
+    elif getattr(e, "winerror", None) == 32:  # File in use
+        logger.warning(f"File in use, skipping: {path}")
+    elif e.errno == errno.ENOTEMPTY or getattr(e, "winerror", None) == 145:  # a child could not be removed
+        logger.warning(f"Directory not empty after cleaning, skipping: {path}")
+    else:
+        logger.error(f"Failed to delete {path}: {e}")
+
+
+class _TreeCleaner:
+    """Empty one directory tree bottom-up in a single pass.
+
+    Each directory is listed once with ``os.scandir``. Files are unlinked as
+    they are met and their size comes from the stat the DirEntry already holds.
+    A directory is removed right after its last child. With ``use_dir_fd``
+    every operation is relative to an open descriptor of its parent (opened
+    with O_NOFOLLOW), so paths are never re-resolved from the root and a
+    directory swapped for a symlink mid-clean cannot redirect the deletion.
+    Symlinks below the root are removed, never followed.
+
+    A file with several hard links only frees its space when its last link
+    goes, so its size is counted once every link seen for it in this tree
+    has been removed, and never if some link lives elsewhere.
+    """
+
+    def __init__(self, root, use_dir_fd):
+        self.root = root
+        self.use_dir_fd = use_dir_fd
+        self.files_removed = self.dirs_removed = self.bytes_freed = self.errors = 0
+        self._links_left = {}  # (st_dev, st_ino) -> links not yet removed, for files with st_nlink > 1
+
+    def run(self):
+        handle = os.open(self.root, _ROOT_FLAGS) if self.use_dir_fd else self.root
+        # (handle, path, remaining entries, name in parent); an explicit stack keeps deep trees off
+        # the recursion limit.
+        stack = [(handle, self.root, iter(self._list(handle, self.root)), None)]
+        try:
+            while stack:
+                handle, path, entries, name = stack[-1]
+                entry = next(entries, None)
+                if entry is None:
+                    stack.pop()
+                    if self.use_dir_fd:
+                        os.close(handle)
+                    if stack:
+                        self._remove_dir(stack[-1][0], name, path)
+                    continue
+                child_path = os.path.join(path, entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        child = os.open(entry.name, _DIR_FLAGS, dir_fd=handle) if self.use_dir_fd else child_path
+                        stack.append((child, child_path, iter(self._list(child, child_path)), entry.name))
+                    else:
+                        stat = entry.stat(follow_symlinks=False)
+                        if self.use_dir_fd:
+                            os.unlink(entry.name, dir_fd=handle)
+                        else:
+                            os.unlink(child_path)
+                        self.files_removed += 1
+                        self.bytes_freed += self._freed(stat)
+                except FileNotFoundError:
+                    continue  # already gone
+                except OSError as e:
+                    self.errors += 1
+                    _log_failure(child_path, e)
+        finally:
+            if self.use_dir_fd:
+                for handle, *_ in stack:
+                    os.close(handle)
+        return CleanResult(self.root, self.files_removed, self.dirs_removed, self.bytes_freed, self.errors)
+
+    def _freed(self, stat):
+        if stat.st_nlink <= 1:  # Windows scandir stats report 0
+            return stat.st_size
+        key = (stat.st_dev, stat.st_ino)
+        left = self._links_left.get(key, stat.st_nlink) - 1
+        if left:
+            self._links_left[key] = left
+            return 0
+        self._links_left.pop(key, None)
+        return stat.st_size
+
+    def _list(self, handle, path):
+        try:
+            with os.scandir(handle) as entries:
+                return list(entries)
+        except OSError as e:
+            self.errors += 1
+            _log_failure(path, e)
+            return []
+
+    def _remove_dir(self, parent, name, path):
+        try:
+            if self.use_dir_fd:
+                os.rmdir(name, dir_fd=parent)
+            else:
+                os.rmdir(path)
+            self.dirs_removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.errors += 1
+            _log_failure(path, e)
+
+
+def clear_tree(root, use_dir_fd=None):
+    """Delete everything inside ``root`` (but not ``root`` itself) and return a ``CleanResult``.
+
+    Files or directories that cannot be removed are logged, counted in
+    ``errors`` and skipped; the rest of the tree is still cleaned.
+    """
+    if use_dir_fd is None:
+        use_dir_fd = SUPPORTS_DIR_FD
+    try:
+        return _TreeCleaner(root, use_dir_fd).run()
+    except FileNotFoundError:
+        logger.warning(f"Directory {root} does not exist.")
+    except OSError as e:
+        _log_failure(root, e)
+    return CleanResult(root, 0, 0, 0, 1)
+
+
+def clear_trees(roots, workers=None):
+    """Clear several roots concurrently; returns their ``CleanResult``s in input order."""
+    roots = list(roots)
+    if not roots:
+        return []
+    with ThreadPoolExecutor(max_workers=workers or len(roots), thread_name_prefix="clean") as executor:
+        return list(executor.map(clear_tree, roots))
@@ -0,0 +1,165 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import groupby
+
+from loguru import logger
+
+from hotel_billing_app import MyHotel, normalize_phone
+from log_config import configure_logging
+
+BatchOrder = namedtuple("BatchOrder", "ref name phone_number address order_type cart")
+BatchResult = namedtuple("BatchResult", "ref customer_id order_id subtotal credits_used total error")
+
+RESULT_FIELDS = BatchResult._fields
+
+
+def read_orders(path):
+    """Stream ``BatchOrder`` records from a JSONL or CSV order file.
+
+    JSONL holds one order per line with an ``items`` object (``{"Idly": 2}``) or
+    a list of ``[item, quantity]`` pairs. CSV holds one cart line per row with
+    the columns ``order_ref, name, phone_number, address, order_type, item_name,
+    quantity``; consecutive rows sharing an ``order_ref`` make one order.
+    A record that cannot be parsed is yielded as an error ``BatchResult``
+    instead, so one bad line does not stop the batch.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.endswith(".jsonl"):
+            for number, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                ref = str(number)
+                try:
+                    record = json.loads(line)
+                    ref = str(record.get("order_ref", number))
+                    items = record.get("items") or {}
+                    cart = items.items() if hasattr(items, "items") else items
+                    yield BatchOrder(
+                        ref, record["name"], record["phone_number"],
+                        record.get("address", ""), record["order_type"],
+                        tuple((name, int(quantity)) for name, quantity in cart)
+                    )
+                except (ValueError, TypeError, KeyError, AttributeError) as exc:
+                    yield _parse_error(ref, f"line {number}", exc)
+        else:
+            reader = csv.DictReader(handle)
+            for ref, rows in groupby(reader, key=lambda row: row.get("order_ref")):
+                line_number = reader.line_num
+                try:
+                    rows = list(rows)
+                    first = rows[0]
+                    yield BatchOrder(
+                        ref, first["name"], first["phone_number"], first.get("address", ""), first["order_type"],
+                        tuple((row["item_name"], int(row["quantity"])) for row in rows)
+                    )
+                except (ValueError, TypeError, KeyError) as exc:
+                    yield _parse_error(ref, f"order starting at line {line_number}", exc)
+
+
+def _parse_error(ref, where, exc):
+    error = f"Unreadable order ({where}): {exc!r}"
+    logger.warning("Order {ref} skipped: {error}", ref=ref, error=error)
+    return BatchResult(ref, None, None, None, None, None, error)
+
+
+class BatchBiller:
+    """Bill a stream of orders through ``MyHotel.checkout`` on a pool of worker threads.
+
+    At most ``max_in_flight`` orders are read ahead of the slowest unfinished
+    one, so memory stays flat for any file size, and results come back in
+    input order. Customer lookups go through MyHotel's id cache; a striped lock
+    keeps two workers from creating the same new customer twice.
+    """
+
+    def __init__(self, hotel, workers=8, max_in_flight=None):
+        self.hotel = hotel
+        self.workers = workers
+        self.max_in_flight = max_in_flight or workers * 4
+        self._customer_locks = [threading.Lock() for _ in range(64)]
+
+    def bill_orders(self, orders):
+        """Yield one ``BatchResult`` per order, in input order; error results from ``read_orders`` pass through."""
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="billing") as executor:
+            for order in orders:
+                if len(pending) >= self.max_in_flight:
+                    yield pending.popleft().result()
+                if isinstance(order, BatchResult):  # unreadable input, already reported by read_orders
+                    done = Future()
+                    done.set_result(order)
+                    pending.append(done)
+                else:
+                    pending.append(executor.submit(self.bill_order, order))
+            while pending:
+                yield pending.popleft().result()
+
+    def bill_order(self, order):
+        try:
+            customer_id = self.customer_id(order)
+            bill = self.hotel.checkout(customer_id, order.order_type, order.cart)
+        except Exception as exc:
+            logger.warning("Order {ref} failed: {error}", ref=order.ref, error=str(exc))
+            return BatchResult(order.ref, None, None, None, None, None, str(exc))
+        return BatchResult(order.ref, customer_id, bill.order_id, bill.subtotal, bill.credits_used, bill.total, None)
+
+    def customer_id(self, order):
+        customer_id = self.hotel.find_customer_id(order.name, order.phone_number)
+        if customer_id is not None:
+            return customer_id
+        key = (order.name, normalize_phone(order.phone_number))
+        with self._customer_locks[hash(key) % len(self._customer_locks)]:
+            customer_id = self.hotel.find_customer_id(order.name, order.phone_number)
+            if customer_id is None:
+                customer_id = self.hotel.create_customer(order.name, order.address, order.phone_number)
+        return customer_id
+
+
+def write_results(results, path):
+    """Write results to ``path`` as CSV as they arrive; return ``(billed, failed)`` counts."""
+    billed = failed = 0
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(RESULT_FIELDS)
+        for result in results:
+            writer.writerow(result)
+            if result.error is None:
+                billed += 1
+            else:
+                failed += 1
+    return billed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bill a CSV or JSONL file of orders through MyHotel.")
+    parser.add_argument("orders", help="Order file (.csv or .jsonl).")
+    parser.add_argument("--output", help="Results CSV (default: <orders>.results.csv).")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("HOTEL_DB_PASSWORD", ""))
+    parser.add_argument("--db-name", default="hotel_db")
+    args = parser.parse_args()
+    configure_logging()
+
+    hotel = MyHotel(args.host, args.user, args.password, args.db_name, pool_size=args.workers + 1)
+    biller = BatchBiller(hotel, workers=args.workers)
+    output = args.output or os.path.splitext(args.orders)[0] + ".results.csv"
+
+    started = time.perf_counter()
+    billed, failed = write_results(biller.bill_orders(read_orders(args.orders)), output)
+    elapsed = time.perf_counter() - started
+    rate = (billed + failed) / elapsed if elapsed else 0.0
+    logger.success(
+        "Billed {billed} order(s), {failed} failed, in {elapsed:.2f}s ({rate:.1f} orders/s). Results: {output}",
+        billed=billed, failed=failed, elapsed=elapsed, rate=rate, output=output
+    )
+
+
+if __name__ == "__main__":
+    main()
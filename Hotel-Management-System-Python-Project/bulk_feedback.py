@@ -0,0 +1,53 @@
+import argparse
+import csv
+import json
+import os
+import time
+
+from loguru import logger
+
+from hotel_billing_app import MyHotel
+from log_config import configure_logging
+
+FEEDBACK_FIELDS = ("customer_id", "stars", "tip", "feedback_time")
+
+
+def read_feedback_records(path):
+    """Stream feedback records from a CSV (with a header row) or JSONL kiosk export, one dict at a time."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.endswith(".jsonl"):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a CSV or JSONL feedback export into MyHotel.")
+    parser.add_argument("path", help=f"Feedback file with the columns {', '.join(FEEDBACK_FIELDS)}.")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("HOTEL_DB_PASSWORD", ""))
+    parser.add_argument("--db-name", default="hotel_db")
+    args = parser.parse_args()
+    configure_logging()
+
+    hotel = MyHotel(args.host, args.user, args.password, args.db_name)
+    started = time.perf_counter()
+    accepted = rejected = 0
+    for result in hotel.save_feedback_bulk(read_feedback_records(args.path), chunk_size=args.chunk_size):
+        if result.accepted:
+            accepted += 1
+        else:
+            rejected += 1
+            logger.warning("Record {index} rejected: {error}", index=result.index, error=result.error)
+    logger.success(
+        "Loaded {accepted} feedback record(s), rejected {rejected}, in {elapsed:.2f}s.",
+        accepted=accepted, rejected=rejected, elapsed=time.perf_counter() - started
+    )
+
+
+if __name__ == "__main__":
+    main()
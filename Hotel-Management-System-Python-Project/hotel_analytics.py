@@ -0,0 +1,166 @@
+import argparse
+import os
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from loguru import logger
+from pymysql.cursors import SSCursor
+
+from hotel_billing_app import MyHotel
+from log_config import configure_logging
+
+ITEM_KEYS = ["day", "order_type", "item_name"]
+
+
+def create_rollup_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS DailyItemRevenue (
+            day DATE NOT NULL,
+            order_type VARCHAR(20) NOT NULL,
+            item_name VARCHAR(50) NOT NULL,
+            quantity INT NOT NULL,
+            revenue INT NOT NULL,
+            PRIMARY KEY (day, order_type, item_name)
+        )
+    """)
+    # Last day the item rollup has seen; that day may have been partial, so it is recomputed on the next refresh.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS RollupWatermarks (
+            name VARCHAR(50) PRIMARY KEY,
+            last_day DATE NOT NULL
+        )
+    """)
+
+
+class HotelAnalytics:
+    """Incremental daily rollups of revenue and feedback for MyHotel.
+
+    ``refresh()`` streams only the order lines from the last rolled-up day
+    onwards through a server-side cursor, aggregates each chunk with pandas
+    and writes the per-day results into DailyItemRevenue. Feedback needs no
+    refresh: MyHotel keeps DailyFeedbackRollup current on every write. The
+    report methods read those tables, so repeat queries never touch the base
+    tables. ``pool`` must belong to a MyHotel, which owns the schema.
+    """
+
+    def __init__(self, pool, chunk_size=20000):
+        self.pool = pool
+        self.chunk_size = chunk_size
+        with self.pool.cursor() as cursor:
+            create_rollup_tables(cursor)
+
+    def refresh(self):
+        return self.refresh_item_revenue()
+
+    def refresh_item_revenue(self):
+        since = self._watermark("item_revenue")
+        query = (
+            "SELECT DATE(h.created_at) AS day, h.order_type, l.item_name, l.quantity, l.amount "
+            "FROM OrderHeaders h JOIN OrderLines l ON l.order_id = h.id WHERE h.created_at IS NOT NULL"
+        )
+        params = ()
+        if since is not None:
+            query += " AND h.created_at >= %s"
+            params = (since,)
+        partials = [
+            chunk.groupby(ITEM_KEYS, sort=False)[["quantity", "amount"]].sum()
+            for chunk in self._stream_frames(query, params, ITEM_KEYS + ["quantity", "amount"])
+        ]
+        if not partials:
+            return 0
+        totals = pd.concat(partials).groupby(level=ITEM_KEYS).sum().reset_index()
+        rows = list(zip(
+            totals["day"], totals["order_type"], totals["item_name"],
+            totals["quantity"].astype(int).tolist(), totals["amount"].astype(int).tolist()
+        ))
+        self._replace_days(
+            "DailyItemRevenue", "item_revenue", since, totals["day"].max(), rows,
+            "INSERT INTO DailyItemRevenue (day, order_type, item_name, quantity, revenue) VALUES (%s, %s, %s, %s, %s)"
+        )
+        return len(rows)
+
+    def item_revenue(self, start, end):
+        """Revenue and quantity per day, meal type and item for days in ``[start, end)``."""
+        return self._read_frame(
+            "SELECT day, order_type, item_name, quantity, revenue FROM DailyItemRevenue "
+            "WHERE day >= %s AND day < %s ORDER BY day, order_type, revenue DESC",
+            (start, end), ["day", "order_type", "item_name", "quantity", "revenue"]
+        )
+
+    def daily_summary(self, start, end):
+        """Revenue per meal type plus feedback count, average stars and tips per day in ``[start, end)``."""
+        revenue = self.item_revenue(start, end)
+        by_type = revenue.pivot_table(
+            index="day", columns="order_type", values="revenue", aggfunc="sum", fill_value=0
+        ).add_prefix("revenue_")
+        feedback = self._read_frame(
+            "SELECT day, feedback_count, stars_total, tip_total FROM DailyFeedbackRollup "
+            "WHERE day >= %s AND day < %s ORDER BY day",
+            (start, end), ["day", "feedback_count", "stars_total", "tip_total"]
+        ).set_index("day")
+        feedback["average_stars"] = (feedback["stars_total"] / feedback["feedback_count"]).round(2)
+        summary = by_type.join(feedback[["feedback_count", "average_stars", "tip_total"]], how="outer")
+        return summary.fillna(0).sort_index()
+
+    def popular_items(self, start, end, top=10):
+        revenue = self.item_revenue(start, end)
+        return (revenue.groupby(["order_type", "item_name"])[["quantity", "revenue"]].sum()
+                .sort_values("quantity", ascending=False).head(top).reset_index())
+
+    def _watermark(self, name):
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT last_day FROM RollupWatermarks WHERE name = %s", (name,))
+            row = cursor.fetchone()
+        return datetime.combine(row[0], datetime.min.time()) if row else None
+
+    def _stream_frames(self, query, params, columns):
+        with self.pool.cursor(SSCursor) as cursor:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    return
+                yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def _read_frame(self, query, params, columns):
+        with self.pool.cursor() as cursor:
+            cursor.execute(query, params)
+            return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+
+    def _replace_days(self, table, name, since, last_day, rows, insert):
+        with self.pool.cursor() as cursor:
+            if since is not None:
+                cursor.execute(f"DELETE FROM {table} WHERE day >= %s", (since.date(),))
+            else:
+                cursor.execute(f"DELETE FROM {table}")
+            cursor.executemany(insert, rows)
+            cursor.execute(
+                "INSERT INTO RollupWatermarks (name, last_day) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE last_day = VALUES(last_day)",
+                (name, last_day)
+            )
+        logger.info("Rolled up {count} row(s) into {table} through {last_day}.",
+                    count=len(rows), table=table, last_day=last_day)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh and print MyHotel revenue and feedback rollups.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("HOTEL_DB_PASSWORD", ""))
+    parser.add_argument("--db-name", default="hotel_db")
+    parser.add_argument("--days", type=int, default=7, help="How many days back to report.")
+    args = parser.parse_args()
+    configure_logging()
+
+    hotel = MyHotel(args.host, args.user, args.password, args.db_name)
+    analytics = HotelAnalytics(hotel.pool)
+    analytics.refresh()
+    end = date.today() + timedelta(days=1)
+    start = end - timedelta(days=args.days)
+    print(analytics.daily_summary(start, end).to_string())
+    print(analytics.popular_items(start, end).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,73 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import count, groupby, islice
+from operator import itemgetter
+
 from loguru import logger
-import pymysql
+from pymysql.cursors import SSCursor
+
+from db_pool import LRUCache, ensure_column, ensure_index, get_pool
+from log_config import configure_logging
+from menu_catalog import MenuCatalog, create_menu_tables
+
+# Credits every checkout earns towards the next visit.
+VISIT_CREDITS = 50
+
+BillLine = namedtuple("BillLine", "item_name quantity unit_price amount")
+Bill = namedtuple("Bill", "order_id customer_id order_type lines subtotal credits_used total credits_earned created_at")
+CreditEntry = namedtuple("CreditEntry", "id order_id entry_type amount balance_after created_at")
+CreditAudit = namedtuple("CreditAudit", "customer_id entries ledger_balance cached_balance first_bad_entry")
+FeedbackResult = namedtuple("FeedbackResult", "index accepted error")
+FeedbackDay = namedtuple(
+    "FeedbackDay", "day feedback_count average_stars tip_total histogram positive neutral negative"
+)
+
+STAR_BUCKETS = tuple(range(6))
+STAR_COLUMNS = ", ".join(f"stars_{stars}" for stars in STAR_BUCKETS)
+FEEDBACK_MESSAGES = {
+    5: "Thank you! Very good maintenance.",
+    4: "Thank you! Very good maintenance.",
+    3: "Good maintenance.",
+    2: "Average maintenance.",
+    1: "Very bad maintenance.",
+    0: "No feedback given."
+}
+
+
+def normalize_phone(phone_number):
+    """Digits only, so "98400 12345" and "98400-12345" are stored and looked up as the same number."""
+    if phone_number is None:
+        return None
+    return "".join(ch for ch in str(phone_number) if ch.isdigit())
+
 
 class MyHotel:
-    def __init__(self, host, user, password, db_name):
+    def __init__(self, host, user, password, db_name, pool_size=10, port=3306, menu_refresh_interval=5.0,
+                 customer_cache_size=4096):
         self.db_name = db_name
         self.host = host
         self.user = user
         self.password = password
-        self.db_connection = self.connect_to_db()
-        self.cursor = self.db_connection.cursor()
-        self.create_tables()
-
-    def connect_to_db(self):
-        connection = pymysql.connect(
-            host=self.host, user=self.user, password=self.password
+        self.pool = get_pool(
+            host, user, password, db_name, schema=self.create_tables, max_size=pool_size, port=port
         )
-        cursor = connection.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name}")
-        cursor.execute(f"USE {self.db_name}")
-        connection.commit()
-        return connection
-
-    def create_tables(self):
-        self._create_customers_table()
-        self._create_orders_table()
-        self._create_feedback_table()
-
-    def _create_customers_table(self):
-        self.cursor.execute("""
+        self.menu = MenuCatalog(self.pool, refresh_interval=menu_refresh_interval)
+        # (name, normalized phone) -> customer id. Only hits are cached and ids never change, so nothing invalidates.
+        self.customer_ids = LRUCache(maxsize=customer_cache_size)
+
+    def create_tables(self, cursor):
+        self._create_customers_table(cursor)
+        self._add_customer_lookup_index(cursor)
+        self._create_orders_table(cursor)
+        self._create_feedback_table(cursor)
+        self._create_feedback_rollup_table(cursor)
+        create_menu_tables(cursor)
+        self._create_order_header_tables(cursor)
+        self._migrate_legacy_orders(cursor)
+        self._create_credit_ledger_table(cursor)
+
+    def _create_customers_table(self, cursor):
+        cursor.execute("""
             CREATE TABLE IF NOT EXISTS Customers (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 name VARCHAR(100),
@@ -36,10 +76,19 @@ class MyHotel:
                 credits INT DEFAULT 0
             )
         """)
-        self.db_connection.commit()
 
-    def _create_orders_table(self):
-        self.cursor.execute("""
+    def _add_customer_lookup_index(self, cursor):
+        # Serves the (name, phone) customer lookups. Rows written before phone numbers were normalized
+        # are cleaned up once, when the index first goes in.
+        if ensure_index(cursor, "Customers", "idx_customers_phone_name", "phone_number, name"):
+            cursor.execute(
+                "UPDATE Customers SET phone_number = REGEXP_REPLACE(phone_number, '[^0-9]', '') "
+                "WHERE phone_number REGEXP '[^0-9]'"
+            )
+            logger.info(f"Normalized {cursor.rowcount} customer phone number(s).")
+
+    def _create_orders_table(self, cursor):
+        cursor.execute("""
             CREATE TABLE IF NOT EXISTS Orders (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 customer_id INT,
@@ -50,10 +99,9 @@ class MyHotel:
                 FOREIGN KEY (customer_id) REFERENCES Customers(id)
             )
         """)
-        self.db_connection.commit()
 
-    def _create_feedback_table(self):
-        self.cursor.execute("""
+    def _create_feedback_table(self, cursor):
+        cursor.execute("""
             CREATE TABLE IF NOT EXISTS Feedback (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 customer_id INT,
@@ -63,132 +111,581 @@ class MyHotel:
                 FOREIGN KEY (customer_id) REFERENCES Customers(id)
             )
         """)
-        self.db_connection.commit()
 
-    def get_customer(self, customer_id):
-        self.cursor.execute("SELECT * FROM Customers WHERE id = %s", (customer_id,))
-        return self.cursor.fetchone()
+    def _create_feedback_rollup_table(self, cursor):
+        # Per-day counts, star histogram and tips, kept current by every feedback write so the
+        # dashboard never scans Feedback. Older databases may already have the table without the
+        # histogram, so it is rebuilt from Feedback once whenever it is created or extended.
+        cursor.execute(
+            "SELECT 1 FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = 'DailyFeedbackRollup'"
+        )
+        is_new = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS DailyFeedbackRollup (
+                day DATE PRIMARY KEY,
+                feedback_count INT NOT NULL,
+                stars_total INT NOT NULL,
+                tip_total INT NOT NULL
+            )
+        """)
+        added = [
+            ensure_column(cursor, "DailyFeedbackRollup", f"stars_{stars}", "INT NOT NULL DEFAULT 0")
+            for stars in STAR_BUCKETS
+        ]
+        if is_new or any(added):
+            histogram = ", ".join(f"SUM(stars = {stars})" for stars in STAR_BUCKETS)
+            cursor.execute("DELETE FROM DailyFeedbackRollup")
+            cursor.execute(
+                f"INSERT INTO DailyFeedbackRollup (day, feedback_count, stars_total, tip_total, {STAR_COLUMNS}) "
+                f"SELECT DATE(feedback_time), COUNT(*), COALESCE(SUM(stars), 0), COALESCE(SUM(tip), 0), {histogram} "
+                "FROM Feedback WHERE feedback_time IS NOT NULL GROUP BY DATE(feedback_time)"
+            )
+            logger.info(f"Rebuilt the feedback rollup for {cursor.rowcount} day(s).")
 
-    def update_customer_credits(self, customer_id, credits):
-        self.cursor.execute("UPDATE Customers SET credits = credits + %s WHERE id = %s", (credits, customer_id))
-        self.db_connection.commit()
+    def _create_order_header_tables(self, cursor):
+        # One header per bill, lines underneath. Orders is kept only as the pre-header legacy table.
+        # created_at stays NULL for bills migrated from Orders, which never recorded a time.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS OrderHeaders (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                customer_id INT,
+                order_type VARCHAR(20) NOT NULL,
+                subtotal INT NOT NULL,
+                credits_used INT NOT NULL DEFAULT 0,
+                total INT NOT NULL,
+                credits_earned INT NOT NULL DEFAULT 0,
+                created_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_order_headers_customer_time (customer_id, created_at),
+                INDEX idx_order_headers_created (created_at),
+                FOREIGN KEY (customer_id) REFERENCES Customers(id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS OrderLines (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                order_id INT NOT NULL,
+                item_name VARCHAR(50) NOT NULL,
+                quantity INT NOT NULL,
+                unit_price INT NOT NULL,
+                amount INT NOT NULL,
+                legacy_order_id INT NULL UNIQUE,
+                FOREIGN KEY (order_id) REFERENCES OrderHeaders(id)
+            )
+        """)
+
+    def _migrate_legacy_orders(self, cursor, page_size=5000):
+        """Group legacy per-item Orders rows into headers and lines.
+
+        The old checkout wrote one row per item back to back, so a run of
+        consecutive ids with the same customer and order type is one bill.
+        Migrated rows are tracked by OrderLines.legacy_order_id, so this
+        resumes where it stopped and is a no-op once everything is moved.
+        """
+        cursor.execute("SELECT COALESCE(MAX(legacy_order_id), 0) FROM OrderLines")
+        last_id = cursor.fetchone()[0]
+        group = []
+        migrated = 0
+        while True:
+            cursor.execute(
+                "SELECT id, customer_id, item_name, quantity, price, order_type FROM Orders "
+                "WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, page_size)
+            )
+            rows = cursor.fetchall()
+            for row in rows:
+                if group and (row[1], row[5]) != (group[0][1], group[0][5]):
+                    migrated += self._insert_legacy_bill(cursor, group)
+                    group = []
+                group.append(row)
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1][0]
+            cursor.connection.commit()
+        if group:
+            migrated += self._insert_legacy_bill(cursor, group)
+        if migrated:
+            logger.info(f"Migrated {migrated} legacy order row(s) into OrderHeaders/OrderLines.")
+
+    def _insert_legacy_bill(self, cursor, rows):
+        customer_id, order_type = rows[0][1], rows[0][5]
+        subtotal = sum(row[4] for row in rows)
+        cursor.execute(
+            "INSERT INTO OrderHeaders (customer_id, order_type, subtotal, total, created_at) "
+            "VALUES (%s, %s, %s, %s, NULL)",
+            (customer_id, order_type, subtotal, subtotal)
+        )
+        order_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO OrderLines (order_id, item_name, quantity, unit_price, amount, legacy_order_id) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            [(order_id, item_name, quantity, price // quantity if quantity else price, price, legacy_id)
+             for legacy_id, _, item_name, quantity, price, _ in rows]
+        )
+        return len(rows)
+
+    def _create_credit_ledger_table(self, cursor):
+        # Append-only history of every credits change. Customers.credits stays as the cached running
+        # balance and is updated in the same transaction as each entry.
+        cursor.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = 'CreditLedger'"
+        )
+        is_new = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS CreditLedger (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                customer_id INT NOT NULL,
+                order_id INT NULL,
+                entry_type VARCHAR(20) NOT NULL,
+                amount INT NOT NULL,
+                balance_after INT NOT NULL,
+                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_credit_ledger_customer (customer_id, id),
+                FOREIGN KEY (customer_id) REFERENCES Customers(id),
+                FOREIGN KEY (order_id) REFERENCES OrderHeaders(id)
+            )
+        """)
+        if is_new:
+            # Balances that predate the ledger become one opening entry each.
+            cursor.execute(
+                "INSERT INTO CreditLedger (customer_id, entry_type, amount, balance_after) "
+                "SELECT id, 'opening', credits, credits FROM Customers WHERE credits <> 0"
+            )
+            logger.info(f"Opened the credit ledger with {cursor.rowcount} existing balance(s).")
+
+    def get_customer(self, customer_id):
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT * FROM Customers WHERE id = %s", (customer_id,))
+            return cursor.fetchone()
+
+    def update_customer_credits(self, customer_id, credits, entry_type="adjustment"):
+        """Add ``credits`` (negative to take them away) and return the new balance."""
+        with self.pool.cursor() as cursor:
+            return self._post_credits(cursor, customer_id, credits, entry_type)
+
+    def _post_credits(self, cursor, customer_id, amount, entry_type, order_id=None):
+        # The guarded UPDATE locks the row and refuses to go negative; LAST_INSERT_ID(expr) hands the
+        # new balance back in the OK packet, so no second SELECT is needed.
+        if amount == 0:
+            cursor.execute("SELECT credits FROM Customers WHERE id = %s", (customer_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        cursor.execute(
+            "UPDATE Customers SET credits = LAST_INSERT_ID(credits + %s) WHERE id = %s AND credits + %s >= 0",
+            (amount, customer_id, amount)
+        )
+        if cursor.rowcount == 0:
+            raise ValueError(f"Customer ID {customer_id} not found or has insufficient credits.")
+        balance = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO CreditLedger (customer_id, order_id, entry_type, amount, balance_after) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (customer_id, order_id, entry_type, amount, balance)
+        )
+        return balance
+
+    def credit_history(self, customer_id, limit=50):
+        """Most recent ledger entries of a customer, newest first."""
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, order_id, entry_type, amount, balance_after, created_at FROM CreditLedger "
+                "WHERE customer_id = %s ORDER BY id DESC LIMIT %s",
+                (customer_id, limit)
+            )
+            return [CreditEntry(*row) for row in cursor.fetchall()]
+
+    def credit_audit(self):
+        """Replay the ledger in one streaming pass.
+
+        Yields a ``CreditAudit`` for every customer whose entries do not add up
+        or whose cached ``Customers.credits`` differs from the ledger balance.
+        """
+        with self.pool.cursor(SSCursor) as cursor:
+            cursor.execute(
+                "SELECT l.customer_id, l.id, l.amount, l.balance_after, c.credits "
+                "FROM CreditLedger l JOIN Customers c ON c.id = l.customer_id ORDER BY l.customer_id, l.id"
+            )
+            for customer_id, rows in groupby(cursor, key=itemgetter(0)):
+                entries = balance = 0
+                first_bad_entry = cached = None
+                for _, entry_id, amount, balance_after, cached in rows:
+                    entries += 1
+                    balance += amount
+                    if first_bad_entry is None and balance_after != balance:
+                        first_bad_entry = entry_id
+                if first_bad_entry is not None or balance != cached:
+                    yield CreditAudit(customer_id, entries, balance, cached, first_bad_entry)
+        with self.pool.cursor(SSCursor) as cursor:
+            cursor.execute(
+                "SELECT c.id, c.credits FROM Customers c WHERE c.credits <> 0 "
+                "AND NOT EXISTS (SELECT 1 FROM CreditLedger l WHERE l.customer_id = c.id)"
+            )
+            for customer_id, cached in cursor:
+                yield CreditAudit(customer_id, 0, 0, cached, None)
 
     def calculate_item_price(self, quantity, price_per_item):
         return quantity * price_per_item
 
     def save_order(self, customer_id, item_name, quantity, price, order_type):
-        self.cursor.execute(
-            "INSERT INTO Orders (customer_id, item_name, quantity, price, order_type) VALUES (%s, %s, %s, %s, %s)",
-            (customer_id, item_name, quantity, price, order_type)
+        """Record a single-item order; ``price`` is the line amount, as before."""
+        with self.pool.cursor() as cursor:
+            order_id = self._insert_order(cursor, customer_id, order_type, price, 0, 0)
+            cursor.execute(
+                "INSERT INTO OrderLines (order_id, item_name, quantity, unit_price, amount) VALUES (%s, %s, %s, %s, %s)",
+                (order_id, item_name, quantity, price // quantity if quantity else price, price)
+            )
+        logger.info(
+            "Order saved: {item_name}, Quantity: {quantity}, Price: {price}, Type: {order_type}",
+            customer_id=customer_id, item_name=item_name, quantity=quantity, price=price, order_type=order_type,
+            sample="order"
         )
-        self.db_connection.commit()
-        logger.info(f"Order saved: {item_name}, Quantity: {quantity}, Price: {price}, Type: {order_type}")
+        return order_id
 
     def save_feedback(self, customer_id, stars, tip):
-        self.cursor.execute(
-            "INSERT INTO Feedback (customer_id, stars, tip) VALUES (%s, %s, %s)",
-            (customer_id, stars, tip)
-        )
-        self.db_connection.commit()
-        logger.info(f"Feedback saved: Stars: {stars}, Tip: {tip}")
+        error = self._feedback_error(stars, tip)
+        if error:
+            raise ValueError(error)
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO Feedback (customer_id, stars, tip) VALUES (%s, %s, %s)",
+                (customer_id, stars, tip)
+            )
+            # Roll up from the stored row so the day matches the server-side feedback_time default.
+            histogram = ", ".join(f"stars = {stars}" for stars in STAR_BUCKETS)
+            cursor.execute(
+                f"INSERT INTO DailyFeedbackRollup (day, feedback_count, stars_total, tip_total, {STAR_COLUMNS}) "
+                f"SELECT DATE(feedback_time), 1, stars, tip, {histogram} FROM Feedback WHERE id = %s "
+                f"ON DUPLICATE KEY UPDATE {self._rollup_increments()}",
+                (cursor.lastrowid,)
+            )
+        logger.info("Feedback saved: Stars: {stars}, Tip: {tip}", customer_id=customer_id, stars=stars, tip=tip)
+
+    def save_feedback_bulk(self, records, chunk_size=1000):
+        """Ingest many feedback records, yielding one ``FeedbackResult`` per record in input order.
+
+        ``records`` is any iterable of dicts with ``customer_id``, ``stars``,
+        ``tip`` and an optional ``feedback_time`` (defaults to now), e.g.
+        ``read_feedback_records(path)``. Each chunk is validated, checked
+        against Customers with one SELECT, inserted with one ``executemany``
+        and folded into the daily rollup in the same transaction.
+        """
+        records = iter(records)
+        for first_index in count(0, chunk_size):
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                return
+            yield from self._save_feedback_chunk(chunk, first_index)
+
+    def _save_feedback_chunk(self, chunk, first_index):
+        now = datetime.now()
+        rows, errors = [], []
+        for record in chunk:
+            try:
+                customer_id = int(record["customer_id"])
+                stars = int(record["stars"])
+                tip = int(record.get("tip") or 0)
+                feedback_time = record.get("feedback_time") or now
+                if isinstance(feedback_time, str):
+                    feedback_time = datetime.fromisoformat(feedback_time)
+            except (KeyError, TypeError, ValueError) as exc:
+                rows.append(None)
+                errors.append(f"Invalid feedback record: {exc}")
+                continue
+            rows.append((customer_id, stars, tip, feedback_time))
+            errors.append(self._feedback_error(stars, tip))
+
+        customer_ids = {row[0] for row, error in zip(rows, errors) if error is None}
+        if customer_ids:
+            with self.pool.cursor() as cursor:
+                cursor.execute("SELECT id FROM Customers WHERE id IN %s", (list(customer_ids),))
+                known = {row[0] for row in cursor.fetchall()}
+            for position, row in enumerate(rows):
+                if errors[position] is None and row[0] not in known:
+                    errors[position] = f"Customer ID {row[0]} not found."
+
+        accepted = [row for row, error in zip(rows, errors) if error is None]
+        if accepted:
+            days = {}
+            for _, stars, tip, feedback_time in accepted:
+                day = days.setdefault(feedback_time.date(), [0, 0, 0] + [0] * len(STAR_BUCKETS))
+                day[0] += 1
+                day[1] += stars
+                day[2] += tip
+                day[3 + stars] += 1
+            placeholders = ", ".join(["%s"] * (4 + len(STAR_BUCKETS)))
+            with self.pool.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO Feedback (customer_id, stars, tip, feedback_time) VALUES (%s, %s, %s, %s)",
+                    accepted
+                )
+                cursor.executemany(
+                    f"INSERT INTO DailyFeedbackRollup (day, feedback_count, stars_total, tip_total, {STAR_COLUMNS}) "
+                    f"VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {self._rollup_increments()}",
+                    [(day, *totals) for day, totals in days.items()]
+                )
+            logger.info("Saved {count} feedback record(s) across {days} day(s).", count=len(accepted),
+                        days=len(days), sample="feedback_bulk")
+        for position, error in enumerate(errors):
+            yield FeedbackResult(first_index + position, error is None, error)
+
+    def _feedback_error(self, stars, tip):
+        if stars not in FEEDBACK_MESSAGES:
+            return f"Stars must be between 0 and 5, got {stars}."
+        if tip < 0:
+            return f"Tip cannot be negative, got {tip}."
+        return None
+
+    def _rollup_increments(self):
+        columns = ("feedback_count", "stars_total", "tip_total") + tuple(f"stars_{stars}" for stars in STAR_BUCKETS)
+        return ", ".join(f"{column} = {column} + VALUES({column})" for column in columns)
+
+    def feedback_dashboard(self, start, end):
+        """One ``FeedbackDay`` per day in ``[start, end)``, read from the rollup only."""
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                f"SELECT day, feedback_count, stars_total, tip_total, {STAR_COLUMNS} FROM DailyFeedbackRollup "
+                "WHERE day >= %s AND day < %s ORDER BY day",
+                (start, end)
+            )
+            rows = cursor.fetchall()
+        days = []
+        for day, feedback_count, stars_total, tip_total, *histogram in rows:
+            days.append(FeedbackDay(
+                day, feedback_count, round(stars_total / feedback_count, 2) if feedback_count else None, tip_total,
+                tuple(histogram),
+                histogram[4] + histogram[5], histogram[3], sum(histogram[1:3])
+            ))
+        return days
 
     def display_menu(self, order_type, customer_id):
         items = self.get_menu_items(order_type)
-        total = 0
         logger.info(f"### {order_type} Menu")
 
         available_credits = self.get_customer_credits(customer_id)
         logger.info(f"Available credits: Rs. {available_credits}")
 
-        total = self.process_order(order_type, customer_id, items, total)
-
-        total = self.apply_credits(available_credits, total, customer_id)
+        cart = self.prompt_cart(items)
+        try:
+            bill = self.checkout(customer_id, order_type, cart)
+        except ValueError as e:
+            logger.error(str(e))
+            return None
+        self.log_bill(bill)
 
-        logger.info(f"#### Total Bill: Rs. {total}")
-        self.add_visit_credits(customer_id)
-        logger.info("50 credits added for the visit.")
-
-        return total
+        return bill.total
 
     def get_menu_items(self, order_type):
-        items = {
-            'Breakfast': {
-                'Idly': 5, 'Vada': 10, 'Dosa': 20, 'Chapathi': 15, 'Puri': 20, 'Parota': 25
-            },
-            'Lunch': {
-                'Meals': 50, 'Veg Rice': 40, 'Gobi': 60, 'Gobi Rice': 50, 'Chapathi': 10, 'Parota': 15
-            }
-        }
-        return items.get(order_type, {})
+        return self.menu.prices(order_type)
 
     def get_customer_credits(self, customer_id):
-        self.cursor.execute("SELECT credits FROM Customers WHERE id = %s", (customer_id,))
-        return self.cursor.fetchone()[0]
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT credits FROM Customers WHERE id = %s", (customer_id,))
+            return cursor.fetchone()[0]
 
-    def process_order(self, order_type, customer_id, items, total):
-        for item, price in items.items():
+    def prompt_cart(self, items):
+        cart = {}
+        for item in items:
             quantity = int(input(f"Enter number of {item}: "))
             if quantity > 0:
-                item_price = self.calculate_item_price(quantity, price)
-                total += item_price
-                self.save_order(customer_id, item, quantity, item_price, order_type)
-                logger.info(f"{item} amount: {item_price}")
-        return total
-
-    def apply_credits(self, available_credits, total, customer_id):
-        if available_credits > 0:
-            if available_credits >= total:
-                total = 0
-                self.update_customer_credits(customer_id, -available_credits)
-                logger.info(f"Credits applied: Rs. {available_credits}. No balance to pay.")
-            else:
-                total -= available_credits
-                self.update_customer_credits(customer_id, -available_credits)
-                logger.info(f"Credits applied: Rs. {available_credits}. Remaining balance: Rs. {total}")
+                cart[item] = quantity
+        return cart
+
+    def price_cart(self, order_type, cart):
+        """Turn ``{item name: quantity}`` (or ``(name, quantity)`` pairs) into bill lines at current menu prices.
+
+        Raises ValueError for an unknown order type, an item not on the menu,
+        or a cart that comes to nothing, so no order or visit credit is ever
+        recorded for an empty bill.
+        """
+        if order_type not in self.menu.order_types():
+            raise ValueError(f"Unknown order type: {order_type}.")
+        prices = self.get_menu_items(order_type)
+        lines = []
+        for item_name, quantity in (cart.items() if hasattr(cart, "items") else cart):
+            if quantity <= 0:
+                continue
+            price = prices.get(item_name)
+            if price is None:
+                raise ValueError(f"{item_name} is not on the {order_type} menu.")
+            lines.append(BillLine(item_name, quantity, price, self.calculate_item_price(quantity, price)))
+        if not lines:
+            raise ValueError("The cart is empty.")
+        if sum(line.amount for line in lines) <= 0:
+            raise ValueError("The cart total is zero.")
+        return lines
+
+    def checkout(self, customer_id, order_type, cart):
+        """Bill a whole cart atomically and return the itemized ``Bill``.
+
+        The customer row is locked, every OrderLines row goes in with one
+        ``executemany``, the credits spent and the visit credits are recorded
+        as CreditLedger entries and applied to the cached balance as one net
+        UPDATE, and the transaction commits once. Credits only cover
+        the bill; any excess stays on the account.
+        """
+        lines = self.price_cart(order_type, cart)
+        subtotal = sum(line.amount for line in lines)
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT credits FROM Customers WHERE id = %s FOR UPDATE", (customer_id,))
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"Customer ID {customer_id} not found.")
+            credits = row[0]
+            credits_used = min(max(credits, 0), subtotal)
+            order_id = self._insert_order(cursor, customer_id, order_type, subtotal, credits_used, VISIT_CREDITS)
+            cursor.executemany(
+                "INSERT INTO OrderLines (order_id, item_name, quantity, unit_price, amount) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(order_id, line.item_name, line.quantity, line.unit_price, line.amount) for line in lines]
+            )
+            # The row is locked, so both ledger entries' running balances are known without re-reading it.
+            entries = []
+            if credits_used:
+                entries.append((customer_id, order_id, "spend", -credits_used, credits - credits_used))
+            entries.append((customer_id, order_id, "visit", VISIT_CREDITS, credits - credits_used + VISIT_CREDITS))
+            cursor.executemany(
+                "INSERT INTO CreditLedger (customer_id, order_id, entry_type, amount, balance_after) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                entries
+            )
+            cursor.execute(
+                "UPDATE Customers SET credits = credits + %s WHERE id = %s",
+                (VISIT_CREDITS - credits_used, customer_id)
+            )
+        return Bill(order_id, customer_id, order_type, tuple(lines), subtotal, credits_used, subtotal - credits_used,
+                    VISIT_CREDITS, datetime.now())
+
+    def _insert_order(self, cursor, customer_id, order_type, subtotal, credits_used, credits_earned):
+        cursor.execute(
+            "INSERT INTO OrderHeaders (customer_id, order_type, subtotal, credits_used, total, credits_earned) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (customer_id, order_type, subtotal, credits_used, subtotal - credits_used, credits_earned)
+        )
+        return cursor.lastrowid
+
+    def get_bill(self, order_id):
+        """Rebuild a bill from its header and lines, or return None."""
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, customer_id, order_type, subtotal, credits_used, total, credits_earned, created_at "
+                "FROM OrderHeaders WHERE id = %s",
+                (order_id,)
+            )
+            header = cursor.fetchone()
+            if header is None:
+                return None
+            cursor.execute(
+                "SELECT item_name, quantity, unit_price, amount FROM OrderLines WHERE order_id = %s ORDER BY id",
+                (order_id,)
+            )
+            lines = tuple(BillLine(*row) for row in cursor.fetchall())
+        order_id, customer_id, order_type, subtotal, credits_used, total, credits_earned, created_at = header
+        return Bill(order_id, customer_id, order_type, lines, subtotal, credits_used, total, credits_earned, created_at)
+
+    def reprint_bill(self, order_id):
+        bill = self.get_bill(order_id)
+        if bill is None:
+            logger.error(f"Bill {order_id} not found.")
+            return None
+        logger.info(f"### Bill {bill.order_id} ({bill.order_type}) - {bill.created_at or 'legacy order'}")
+        self.log_bill(bill)
+        return bill
+
+    def customer_bills(self, customer_id, start=None, end=None, limit=50):
+        """Most recent bill headers of a customer, newest first, optionally within ``[start, end)``."""
+        query = (
+            "SELECT id, order_type, subtotal, credits_used, total, created_at FROM OrderHeaders "
+            "WHERE customer_id = %s"
+        )
+        params = [customer_id]
+        if start is not None:
+            query += " AND created_at >= %s"
+            params.append(start)
+        if end is not None:
+            query += " AND created_at < %s"
+            params.append(end)
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit)
+        with self.pool.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def daily_revenue(self, day):
+        """``(order_type, bills, subtotal, credits_used, total)`` per order type for ``day`` (a date)."""
+        start = datetime.combine(day, datetime.min.time())
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT order_type, COUNT(*), SUM(subtotal), SUM(credits_used), SUM(total) FROM OrderHeaders "
+                "WHERE created_at >= %s AND created_at < %s GROUP BY order_type",
+                (start, start + timedelta(days=1))
+            )
+            return cursor.fetchall()
+
+    def log_bill(self, bill):
+        for line in bill.lines:
+            logger.info("{item} amount: {item_price}", item=line.item_name, item_price=line.amount)
+        if bill.credits_used:
+            logger.info("Credits applied: Rs. {credits}. Remaining balance: Rs. {total}",
+                        customer_id=bill.customer_id, credits=bill.credits_used, total=bill.total)
         else:
-            logger.info(f"No credits available for customer ID {customer_id}. Full amount to pay: Rs. {total}")
-        return total
-
-    def add_visit_credits(self, customer_id):
-        self.update_customer_credits(customer_id, 50)
+            logger.info("No credits applied for customer ID {customer_id}. Full amount to pay: Rs. {total}",
+                        customer_id=bill.customer_id, total=bill.total)
+        logger.info("#### Total Bill: Rs. {total}", customer_id=bill.customer_id, total=bill.total)
+        logger.info("{credits} credits added for the visit.", credits=bill.credits_earned)
 
     def collect_feedback(self, customer_id):
         logger.info("### Feedback")
         stars = int(input("How many stars would you give? (0-5): "))
         tip = int(input("Enter tip amount (if any): "))
+        error = self._feedback_error(stars, tip)
+        if error:
+            logger.error(error)
+            return
         self.save_feedback(customer_id, stars, tip)
         logger.info(f"Feedback saved! Stars: {stars}, Tip: Rs. {tip}")
         self.handle_feedback(stars)
 
     def handle_feedback(self, stars):
-        feedback_messages = {
-            5: "Thank you! Very good maintenance.",
-            4: "Thank you! Very good maintenance.",
-            3: "Good maintenance.",
-            2: "Average maintenance.",
-            1: "Very bad maintenance.",
-            0: "No feedback given."
-        }
-        logger.info(feedback_messages.get(stars, "Invalid star rating."))
+        logger.info(FEEDBACK_MESSAGES.get(stars, "Invalid star rating."))
 
     def create_customer(self, name, address, phone_number):
-        self.cursor.execute(
-            "INSERT INTO Customers (name, address, phone_number) VALUES (%s, %s, %s)",
-            (name, address, phone_number)
-        )
-        self.db_connection.commit()
-        logger.info(f"Customer created: {name}, {address}, {phone_number}")
-        return self.cursor.lastrowid
+        phone_number = normalize_phone(phone_number)
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO Customers (name, address, phone_number) VALUES (%s, %s, %s)",
+                (name, address, phone_number)
+            )
+            customer_id = cursor.lastrowid
+        logger.info("Customer created: {name}, {address}, {phone_number}", name=name, address=address,
+                    phone_number=phone_number)
+        return customer_id
+
+    def find_customer_id(self, name, phone_number):
+        """Customer id for ``(name, phone_number)``, served from the lookup cache when possible."""
+        key = (name, normalize_phone(phone_number))
+        customer_id = self.customer_ids.get(key)
+        if customer_id is None:
+            with self.pool.cursor() as cursor:
+                cursor.execute(
+                    "SELECT id FROM Customers WHERE phone_number = %s AND name = %s ORDER BY id LIMIT 1",
+                    (key[1], name)
+                )
+                row = cursor.fetchone()
+            if row is None:
+                return None
+            customer_id = row[0]
+            self.customer_ids.put(key, customer_id)
+        return customer_id
 
     def find_customer_by_name_and_phone(self, name, phone_number):
-        self.cursor.execute(
-            "SELECT * FROM Customers WHERE name = %s AND phone_number = %s", (name, phone_number)
-        )
-        return self.cursor.fetchone()
+        # The row itself is re-read by primary key so credits are never stale.
+        customer_id = self.find_customer_id(name, phone_number)
+        return self.get_customer(customer_id) if customer_id is not None else None
 
 
 # Main function for interaction
 if __name__ == "__main__":
+    configure_logging()
     logger.info("Welcome to Hotel Manasa")
 
     # Get database connection details from the user
@@ -213,12 +710,14 @@ if __name__ == "__main__":
         customer_address = input("Enter customer address: ")
         customer_id = hotel.create_customer(customer_name, customer_address, customer_phone)
 
-    order_type = input("Select Order Type (Breakfast or Lunch): ")
-    if order_type not in ['Breakfast', 'Lunch']:
+    order_types = hotel.menu.order_types()
+    order_type = input(f"Select Order Type ({' or '.join(order_types)}): ")
+    if order_type not in order_types:
         logger.error("Invalid order type selected!")
     else:
         total = hotel.display_menu(order_type, customer_id)
-        logger.info(f"The total Hotel bill is: Rs. {total}")
+        if total is not None:
+            logger.info(f"The total Hotel bill is: Rs. {total}")
 
         feedback_section = input("Would you like to give feedback? (Yes/No): ")
         if feedback_section.lower() == 'yes':
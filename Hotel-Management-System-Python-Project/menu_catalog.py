@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from types import MappingProxyType
+
+from loguru import logger
+
+# namedtuple records are immutable and declare __slots__ = (), so an item costs one tuple.
+MenuItem = namedtuple("MenuItem", "order_type name price available_from available_to")
+
+DEFAULT_MENU = {
+    'Breakfast': {
+        'Idly': 5, 'Vada': 10, 'Dosa': 20, 'Chapathi': 15, 'Puri': 20, 'Parota': 25
+    },
+    'Lunch': {
+        'Meals': 50, 'Veg Rice': 40, 'Gobi': 60, 'Gobi Rice': 50, 'Chapathi': 10, 'Parota': 15
+    }
+}
+
+
+def create_menu_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MenuItems (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            order_type VARCHAR(20) NOT NULL,
+            item_name VARCHAR(50) NOT NULL,
+            price INT NOT NULL,
+            available_from TIME NULL,
+            available_to TIME NULL,
+            active BOOLEAN NOT NULL DEFAULT TRUE,
+            UNIQUE KEY uq_menu_item (order_type, item_name)
+        )
+    """)
+    # Single-row version stamp; every menu change bumps it in the same transaction.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS MenuVersion (
+            id TINYINT PRIMARY KEY,
+            version INT NOT NULL
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO MenuVersion (id, version) VALUES (1, 1)")
+    if cursor.rowcount == 1:
+        cursor.executemany(
+            "INSERT IGNORE INTO MenuItems (order_type, item_name, price) VALUES (%s, %s, %s)",
+            [(order_type, name, price) for order_type, items in DEFAULT_MENU.items() for name, price in items.items()]
+        )
+        logger.info("Menu catalog seeded with the default Breakfast and Lunch menus.")
+
+
+def _as_time(value):
+    # pymysql returns TIME columns as timedelta since midnight.
+    if isinstance(value, timedelta):
+        return (datetime.min + value).time()
+    return value
+
+
+def _is_available(item, at):
+    start, end = item.available_from, item.available_to
+    if start is None and end is None:
+        return True
+    if start is None:
+        return at < end
+    if end is None:
+        return at >= start
+    if start <= end:
+        return start <= at < end
+    return at >= start or at < end  # window crosses midnight
+
+
+class MenuCatalog:
+    """In-process cache of the MenuItems table.
+
+    Lookups are dict reads. The catalog checks the one-row MenuVersion stamp at
+    most every ``refresh_interval`` seconds and reloads only when the version
+    has moved, so price and menu changes made by any process show up without a
+    redeploy and without a database hit per order.
+    """
+
+    def __init__(self, pool, refresh_interval=5.0):
+        self.pool = pool
+        self.refresh_interval = refresh_interval
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        # (items by order type, items by (order type, name), price maps of window-free menus),
+        # swapped as one tuple so readers on other threads never see a half-built catalog.
+        self._state = ({}, {}, {})
+
+    def order_types(self):
+        return tuple(self._current()[0])
+
+    def items(self, order_type, at=None):
+        """Items of ``order_type`` whose time window contains ``at`` (default: now)."""
+        by_type, _, prices = self._current()
+        items = by_type.get(order_type, ())
+        if order_type in prices:
+            return items
+        at = (at or datetime.now()).time()
+        return tuple(item for item in items if _is_available(item, at))
+
+    def prices(self, order_type, at=None):
+        """Read-only ``{item name: price}`` for what can be ordered at ``at``."""
+        prices = self._current()[2].get(order_type)
+        if prices is not None:
+            return prices
+        return MappingProxyType({item.name: item.price for item in self.items(order_type, at)})
+
+    def get(self, order_type, name):
+        return self._current()[1].get((order_type, name))
+
+    def set_item(self, order_type, name, price, available_from=None, available_to=None, active=True):
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO MenuItems (order_type, item_name, price, available_from, available_to, active) "
+                "VALUES (%s, %s, %s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE price = VALUES(price), available_from = VALUES(available_from), "
+                "available_to = VALUES(available_to), active = VALUES(active)",
+                (order_type, name, price, available_from, available_to, active)
+            )
+            cursor.execute("UPDATE MenuVersion SET version = version + 1 WHERE id = 1")
+        self.refresh(force=True)
+
+    def remove_item(self, order_type, name):
+        self.set_item(order_type, name, 0, active=False)
+
+    def _current(self):
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self.refresh()
+        return self._state
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.refresh_interval:
+                return  # another thread refreshed while we waited for the lock
+            with self.pool.cursor() as cursor:
+                cursor.execute("SELECT version FROM MenuVersion WHERE id = 1")
+                row = cursor.fetchone()
+                version = row[0] if row else None
+                if force or version != self._version:
+                    cursor.execute(
+                        "SELECT order_type, item_name, price, available_from, available_to FROM MenuItems "
+                        "WHERE active ORDER BY order_type, id"
+                    )
+                    self._load(cursor.fetchall(), version)
+            self._checked_at = time.monotonic()
+
+    def _load(self, rows, version):
+        by_type = {}
+        for order_type, name, price, available_from, available_to in rows:
+            item = MenuItem(order_type, name, price, _as_time(available_from), _as_time(available_to))
+            by_type.setdefault(order_type, []).append(item)
+        by_type = {order_type: tuple(items) for order_type, items in by_type.items()}
+        # Menus without time windows never change between reloads, so their price maps are built once here.
+        prices = {
+            order_type: MappingProxyType({item.name: item.price for item in items})
+            for order_type, items in by_type.items()
+            if all(item.available_from is None and item.available_to is None for item in items)
+        }
+        by_key = {(item.order_type, item.name): item for items in by_type.values() for item in items}
+        self._state = (by_type, by_key, prices)
+        self._version = version
+        logger.info("Menu catalog loaded at version {version}: {count} item(s).", version=version, count=len(rows))
@@ -0,0 +1,243 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pymysql
+from loguru import logger
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of pymysql connections to one database.
+
+    At most ``max_size`` connections are open at any time. Idle connections are
+    reused most-recently-used first and are pinged on checkout once they have
+    been idle for longer than ``ping_interval`` seconds, so a dead connection is
+    replaced transparently instead of failing the caller's query.
+    """
+
+    def __init__(self, host, user, password, db_name, max_size=10, timeout=10.0, ping_interval=30.0,
+                 **connect_kwargs):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.db_name = db_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.connect_kwargs = connect_kwargs
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()
+        self._closed = False
+
+    def _connect(self):
+        return pymysql.connect(
+            host=self.host, user=self.user, password=self.password, database=self.db_name,
+            autocommit=False, **self.connect_kwargs
+        )
+
+    def _is_healthy(self, connection, idle_since):
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except pymysql.Error:
+            return False
+
+    def acquire(self):
+        if self._closed:
+            raise PoolTimeoutError("Connection pool is closed.")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(f"No database connection available after {self.timeout} seconds.")
+        try:
+            while True:
+                try:
+                    connection, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_healthy(connection, idle_since):
+                    return connection
+                logger.warning("Discarding stale database connection.")
+                self._close_quietly(connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard or self._closed or not connection.open:
+                self._close_quietly(connection)
+            else:
+                self._idle.put((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; roll back and discard it if the block raises."""
+        connection = self.acquire()
+        try:
+            yield connection
+        except BaseException:
+            self._rollback_quietly(connection)
+            self.release(connection, discard=not connection.open)
+            raise
+        self.release(connection)
+
+    @contextmanager
+    def cursor(self, cursor_class=None):
+        """Borrow a short-lived cursor that commits once when the block succeeds."""
+        with self.connection() as connection:
+            cursor = connection.cursor(cursor_class) if cursor_class else connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            connection.commit()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_quietly(connection)
+
+    @staticmethod
+    def _rollback_quietly(connection):
+        try:
+            connection.rollback()
+        except pymysql.Error:
+            pass
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except pymysql.Error:
+            pass
+
+
+class LRUCache:
+    """A small thread-safe LRU map with an optional per-entry time-to-live in seconds."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_pools = {}
+_schemas_applied = {}  # pool key -> schema callbacks already run against it
+_pools_lock = threading.Lock()
+
+
+def create_database(host, user, password, db_name, **connect_kwargs):
+    connection = pymysql.connect(host=host, user=user, password=password, **connect_kwargs)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{db_name}`")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def get_pool(host, user, password, db_name, schema=None, max_size=10, **connect_kwargs):
+    """Return the process-wide pool for ``db_name``, creating it on first use.
+
+    The database is created with the pool, and ``schema(cursor)`` runs the
+    first time each schema callback is seen for that pool, so later instances
+    of the same app skip the DDL while a different app sharing the database
+    still gets its own tables. A bound method counts as its class's function.
+    """
+    key = (host, connect_kwargs.get("port"), user, db_name)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            create_database(host, user, password, db_name, **connect_kwargs)
+            pool = ConnectionPool(host, user, password, db_name, max_size=max_size, **connect_kwargs)
+            _pools[key] = pool
+            logger.info(f"Connection pool ready for database {db_name} (max {max_size} connections).")
+        if schema is not None:
+            schema_key = getattr(schema, "__func__", schema)
+            if schema_key not in _schemas_applied.setdefault(key, set()):
+                with pool.cursor() as cursor:
+                    schema(cursor)
+                _schemas_applied[key].add(schema_key)
+    return pool
+
+
+def ensure_index(cursor, table, index_name, columns, unique=False):
+    """Create ``index_name`` on ``table`` unless it already exists (MySQL has no CREATE INDEX IF NOT EXISTS).
+
+    Returns True when the index was created by this call.
+    """
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table, index_name)
+    )
+    if cursor.fetchone() is None:
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        cursor.execute(f"CREATE {kind} {index_name} ON {table} ({columns})")
+        logger.info(f"Created index {index_name} on {table} ({columns}).")
+        return True
+    return False
+
+
+def ensure_column(cursor, table, column, definition):
+    """Add ``column`` to ``table`` unless it already exists; returns True when this call added it."""
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+        (table, column)
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added column {column} to {table}.")
+        return True
+    return False
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        _schemas_applied.clear()
@@ -0,0 +1,367 @@
+import argparse
+import json
+import math
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+import pymysql
+from loguru import logger
+
+from log_config import configure_logging
+from vehicle_parking_app import VehicleParkingSystem
+
+GateEvent = namedtuple("GateEvent", "plate direction vehicle_type customer_id timestamp")
+
+DIRECTIONS = ("in", "out")
+COUNTERS = ("received", "invalid", "duplicates", "checked_in", "checked_out", "rejected", "batches", "retries",
+            "failed")
+# Deadlock, lock wait timeout, server gone away, lost connection: worth another attempt on a fresh connection.
+TRANSIENT_ERRORS = (1213, 1205, 2006, 2013)
+_STOP = object()
+
+
+def parse_event(line, received_at=None):
+    """Turn one JSON gate event into a ``GateEvent``; raises ValueError for anything unusable.
+
+    ``{"plate": "KA 01 AB 1234", "direction": "in", "ts": 1718000000.5, "vehicle_type": "4-wheeler"}``
+    ``ts`` may be epoch seconds or an ISO timestamp and defaults to the time the
+    line was received. ``vehicle_type`` and ``customer_id`` are optional; missing
+    ones are looked up from the registered Vehicles.
+    """
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Malformed gate event: {exc}") from exc
+    if not isinstance(record, dict):
+        raise ValueError("Malformed gate event: not a JSON object")
+    plate, direction = record.get("plate"), record.get("direction")
+    if not isinstance(plate, str) or not isinstance(direction, str):
+        raise ValueError(f"Malformed gate event: plate={plate!r} direction={direction!r}")
+    plate, direction = VehicleParkingSystem.normalize_plate(plate), direction.lower()
+    if not plate or direction not in DIRECTIONS:
+        raise ValueError(f"Malformed gate event: plate={plate!r} direction={direction!r}")
+    vehicle_type, customer_id = record.get("vehicle_type"), record.get("customer_id")
+    if vehicle_type is not None and not isinstance(vehicle_type, str):
+        raise ValueError(f"Malformed gate event: vehicle_type={vehicle_type!r}")
+    if customer_id is not None and (isinstance(customer_id, bool) or not isinstance(customer_id, int)):
+        raise ValueError(f"Malformed gate event: customer_id={customer_id!r}")
+    timestamp = record.get("ts")
+    if timestamp is None:
+        timestamp = received_at or time.time()
+    elif isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        except ValueError as exc:
+            raise ValueError(f"Malformed gate event: ts={timestamp!r}") from exc
+    elif isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)) or not math.isfinite(timestamp):
+        raise ValueError(f"Malformed gate event: ts={timestamp!r}")
+    return GateEvent(plate, direction, vehicle_type, customer_id, float(timestamp))
+
+
+class GateIngestor:
+    """Feed plate-read events into VehicleParkingSystem in micro-batches.
+
+    Sources call ``submit_line()``. Events wait in a bounded queue, and
+    ``submit`` blocks while the queue is full, so a burst slows the readers
+    (and, for sockets, the cameras' TCP connections) instead of piling up in
+    memory or on the database. One worker thread drains the queue in batches
+    of up to ``batch_size`` events or ``max_batch_wait`` seconds. It drops a
+    repeated read of the same plate and direction within ``dedupe_window``
+    seconds, then applies each batch as one ``check_in_batch`` and one
+    ``check_out_batch``. A plate seen twice in a batch splits it, so its
+    entry and exit keep their order.
+
+    A deadlock, lock wait timeout or lost connection is retried up to
+    ``retries`` times. If a group still fails, its events are applied one at
+    a time, so only the events that fail on their own are lost; those are
+    appended to the ``dead_letter`` JSONL file in the input format, with the
+    error added, so they can be replayed with ``--file --from-start``.
+    """
+
+    def __init__(self, parking, dedupe_window=10.0, batch_size=200, max_batch_wait=0.25, queue_size=5000,
+                 retries=3, retry_backoff=0.1, dead_letter=None):
+        self.parking = parking
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter = dead_letter
+        self.dedupe_window = dedupe_window
+        self.batch_size = batch_size
+        self.max_batch_wait = max_batch_wait
+        self.events = queue.Queue(maxsize=queue_size)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.lag = 0.0
+        self._counters_lock = threading.Lock()
+        self._recent = OrderedDict()  # (plate, direction) -> last read time, oldest first
+        self._started = time.monotonic()
+        self._worker = threading.Thread(target=self._run, name="gate-ingest", daemon=True)
+
+    def start(self):
+        self._worker.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Process everything already queued, then stop the worker."""
+        self.events.put(_STOP)
+        self._worker.join(timeout)
+
+    def submit_line(self, line, received_at=None):
+        try:
+            event = parse_event(line, received_at)
+        except ValueError as exc:
+            self._count("invalid")
+            logger.warning("Skipped gate event: {error}", error=str(exc), sample="gate_invalid")
+            return False
+        self.submit(event)
+        return True
+
+    def submit(self, event):
+        self._count("received")
+        self.events.put(event)
+
+    def stats(self):
+        with self._counters_lock:
+            stats = dict(self.counters)
+        elapsed = time.monotonic() - self._started
+        processed = stats["checked_in"] + stats["checked_out"] + stats["rejected"] + stats["duplicates"]
+        stats.update(
+            queue_depth=self.events.qsize(),
+            lag_seconds=round(self.lag, 3),
+            events_per_sec=round(processed / elapsed, 2) if elapsed else 0.0,
+            uptime_seconds=round(elapsed, 1),
+        )
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self.counters[name] += amount
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                try:
+                    self._process(batch)
+                except Exception:
+                    self._count("failed", len(batch))
+                    logger.exception("Gate batch of {count} event(s) failed.", count=len(batch))
+                self._count("batches")
+                self.lag = max(time.time() - batch[-1].timestamp, 0.0)
+
+    def _next_batch(self):
+        first = self.events.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self.events.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event is _STOP:
+                return batch, True
+            batch.append(event)
+        return batch, False
+
+    def _process(self, batch):
+        arrivals, departures, seen = {}, [], set()
+        for event in batch:
+            if self._is_duplicate(event):
+                continue
+            if event.plate in seen:
+                self._apply(arrivals, departures)
+                arrivals, departures, seen = {}, [], set()
+            seen.add(event.plate)
+            if event.direction == "in":
+                arrivals[event.plate] = event
+            else:
+                departures.append(event)
+        self._apply(arrivals, departures)
+
+    def _apply(self, arrivals, departures):
+        # Check-ins and check-outs are separate transactions, so each is retried and split on its own.
+        if arrivals:
+            self._apply_group(self._check_in, list(arrivals.values()))
+        if departures:
+            self._apply_group(self._check_out, departures)
+
+    def _apply_group(self, apply, events):
+        try:
+            self._with_retries(apply, events)
+            return
+        except Exception as exc:
+            if len(events) == 1:
+                self._dead_letter(events, exc)
+                return
+            logger.opt(exception=exc).warning("Gate group of {count} event(s) failed; applying them one by one.",
+                                              count=len(events))
+        for event in events:
+            try:
+                self._with_retries(apply, [event])
+            except Exception as exc:
+                self._dead_letter([event], exc)
+
+    def _with_retries(self, apply, events):
+        for attempt in range(self.retries + 1):
+            try:
+                return apply(events)
+            except pymysql.OperationalError as exc:
+                if attempt == self.retries or exc.args[0] not in TRANSIENT_ERRORS:
+                    raise
+                self._count("retries")
+                logger.warning("Transient database error {code}; retrying {count} gate event(s).",
+                               code=exc.args[0], count=len(events), sample="gate_retry")
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def _dead_letter(self, events, exc):
+        self._count("failed", len(events))
+        logger.opt(exception=exc).error("Dropped {count} gate event(s): {error}", count=len(events), error=str(exc))
+        if not self.dead_letter:
+            return
+        try:
+            with open(self.dead_letter, "a", encoding="utf-8") as handle:
+                for event in events:
+                    handle.write(json.dumps({
+                        "plate": event.plate, "direction": event.direction, "ts": event.timestamp,
+                        "vehicle_type": event.vehicle_type, "customer_id": event.customer_id, "error": str(exc),
+                    }) + "\n")
+        except OSError:
+            logger.exception("Could not write {count} gate event(s) to {path}.", count=len(events),
+                             path=self.dead_letter)
+
+    def _check_in(self, arrivals):
+        unknown = [event.plate for event in arrivals if not event.vehicle_type or event.customer_id is None]
+        owners = self.parking.vehicle_owners(unknown)
+        entries = []
+        for event in arrivals:
+            customer_id, vehicle_type = owners.get(event.plate, (None, None))
+            entries.append((
+                event.customer_id if event.customer_id is not None else customer_id,
+                event.plate,
+                event.vehicle_type or vehicle_type,
+            ))
+        opened = self.parking.check_in_batch(entries)
+        self._count("checked_in", len(opened))
+        self._count("rejected", len(arrivals) - len(opened))
+
+    def _check_out(self, departures):
+        closed = self.parking.check_out_batch([event.plate for event in departures])
+        self._count("checked_out", len(closed))
+        self._count("rejected", len(departures) - len(closed))
+
+    def _is_duplicate(self, event):
+        recent = self._recent
+        while recent:
+            oldest = next(iter(recent.values()))
+            if oldest >= event.timestamp - self.dedupe_window:
+                break
+            recent.popitem(last=False)
+        key = (event.plate, event.direction)
+        last = recent.get(key)
+        recent[key] = event.timestamp
+        recent.move_to_end(key)
+        if last is not None and event.timestamp - last < self.dedupe_window:
+            self._count("duplicates")
+            return True
+        return False
+
+
+def _submit_line(ingestor, line):
+    # A reader thread must outlive any one bad line, whatever it raises.
+    try:
+        ingestor.submit_line(line)
+    except Exception:
+        logger.exception("Gate event reader skipped a line: {line!r}", line=line[:200], sample="gate_reader_error")
+
+
+def tail_file(ingestor, path, from_start=False, poll_interval=0.25, stop=None):
+    """Follow ``path`` like ``tail -f`` and submit every complete line until ``stop`` is set."""
+    with open(path, encoding="utf-8") as handle:
+        if not from_start:
+            handle.seek(0, os.SEEK_END)
+        partial = ""
+        while stop is None or not stop.is_set():
+            line = handle.readline()
+            if not line:
+                time.sleep(poll_interval)
+                continue
+            if not line.endswith("\n"):
+                partial += line
+                continue
+            if (partial + line).strip():
+                _submit_line(ingestor, partial + line)
+            partial = ""
+
+
+class _GateEventHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace")
+            if line.strip():
+                _submit_line(self.server.ingestor, line)
+
+
+class GateEventServer(socketserver.ThreadingTCPServer):
+    """TCP listener for cameras that push newline-delimited JSON events."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, ingestor):
+        self.ingestor = ingestor
+        super().__init__(address, _GateEventHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest ANPR gate events into the parking database.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="Event file to follow.")
+    source.add_argument("--listen", help="host:port to accept newline-delimited JSON events on.")
+    parser.add_argument("--from-start", action="store_true", help="Read --file from the beginning.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dedupe-window", type=float, default=10.0, help="Seconds.")
+    parser.add_argument("--queue-size", type=int, default=5000)
+    parser.add_argument("--dead-letter", default="gate_events.dead.jsonl",
+                        help="JSONL file for events that could not be applied.")
+    parser.add_argument("--stats-interval", type=float, default=30.0, help="Seconds between stats logs.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("PARKING_DB_PASSWORD", ""))
+    parser.add_argument("--db-name", default="parking_db")
+    args = parser.parse_args()
+    configure_logging()
+
+    parking = VehicleParkingSystem(args.host, args.user, args.password, args.db_name)
+    ingestor = GateIngestor(parking, dedupe_window=args.dedupe_window, batch_size=args.batch_size,
+                            queue_size=args.queue_size, dead_letter=args.dead_letter).start()
+    stop = threading.Event()
+    if args.file:
+        reader = threading.Thread(target=tail_file, args=(ingestor, args.file, args.from_start),
+                                  kwargs={"stop": stop}, daemon=True)
+    else:
+        host, port = args.listen.rsplit(":", 1)
+        server = GateEventServer((host, int(port)), ingestor)
+        reader = threading.Thread(target=server.serve_forever, daemon=True)
+    reader.start()
+    try:
+        while not stop.wait(args.stats_interval):
+            logger.info("Gate ingest stats: {stats}", stats=ingestor.stats())
+    except KeyboardInterrupt:
+        stop.set()
+        if args.listen:
+            server.shutdown()
+        ingestor.stop()
+        logger.info("Gate ingest stopped: {stats}", stats=ingestor.stats())
+
+
+if __name__ == "__main__":
+    main()
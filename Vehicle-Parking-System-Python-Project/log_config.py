@@ -0,0 +1,56 @@
+import os
+import sys
+import threading
+
+from loguru import logger
+
+
+class Sampler:
+    """Loguru filter that keeps one in every N records of a sampled event.
+
+    Hot paths tag their records with ``sample="<event>"``; untagged records are
+    always kept. ``rates`` maps event names to N, and events not listed use
+    ``default_rate``.
+    """
+
+    def __init__(self, rates=None, default_rate=1):
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        event = record["extra"].get("sample")
+        if event is None:
+            return True
+        rate = self.rates.get(event, self.default_rate)
+        if rate <= 1:
+            return True
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        return count % rate == 0
+
+
+def configure_logging(level=None, json_logs=None, sink=sys.stderr, enqueue=True, sample_rates=None,
+                      default_sample_rate=None):
+    """Replace loguru's default handler with one shared setup for the DB apps.
+
+    Records are handed to a background writer (``enqueue``), so sink I/O stays
+    off the request threads. They are emitted as JSON with the call's keyword
+    arguments as structured ``extra`` fields when ``json_logs`` is set.
+    Unset arguments fall back to the ``LOG_LEVEL``, ``LOG_JSON`` and
+    ``LOG_SAMPLE_RATE`` environment variables.
+    """
+    if level is None:
+        level = os.environ.get("LOG_LEVEL", "INFO")
+    if json_logs is None:
+        json_logs = os.environ.get("LOG_JSON", "0") == "1"
+    if default_sample_rate is None:
+        default_sample_rate = int(os.environ.get("LOG_SAMPLE_RATE", "1"))
+    logger.remove()
+    logger.add(
+        sink, level=level, serialize=json_logs, enqueue=enqueue, backtrace=False, diagnose=False,
+        filter=Sampler(sample_rates, default_sample_rate)
+    )
+    return logger
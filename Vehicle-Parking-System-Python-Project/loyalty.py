@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+import numpy as np
+from loguru import logger
+
+# vehicle_type None applies to every type; max_visits None has no upper bound.
+LoyaltyRule = namedtuple("LoyaltyRule", "vehicle_type min_visits max_visits credit discount_percent")
+VisitResult = namedtuple("VisitResult", "customer_id visit_count credit discount_percent")
+
+DEFAULT_RULES = (
+    LoyaltyRule('2-wheeler', 1, 1, 10, 0),  # first-visit credit
+    LoyaltyRule('4-wheeler', 1, 1, 20, 0),
+    LoyaltyRule('6-wheeler', 1, 1, 30, 0),
+    LoyaltyRule(None, 2, None, 0, 10),  # 10% off from the second visit on
+)
+
+
+def create_loyalty_tables(cursor):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = 'LoyaltyRules'"
+    )
+    is_new = cursor.fetchone() is None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS LoyaltyRules (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            vehicle_type VARCHAR(50) NULL,
+            min_visits INT NOT NULL,
+            max_visits INT NULL,
+            credit DECIMAL(10, 2) NOT NULL DEFAULT 0,
+            discount_percent DECIMAL(5, 2) NOT NULL DEFAULT 0
+        )
+    """)
+    if is_new:
+        cursor.executemany(
+            "INSERT INTO LoyaltyRules (vehicle_type, min_visits, max_visits, credit, discount_percent) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            DEFAULT_RULES
+        )
+
+
+class LoyaltyRules:
+    """In-process cache of the LoyaltyRules table.
+
+    Every rule whose vehicle type and visit range match a visit applies: the
+    credits of matching rules add up and the largest discount wins. Rules are
+    re-read at most every ``refresh_interval`` seconds, so lookups never wait
+    on the database.
+    """
+
+    def __init__(self, pool, refresh_interval=60.0):
+        self.pool = pool
+        self.refresh_interval = refresh_interval
+        self._rules = ()
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        with self._lock:
+            with self.pool.cursor() as cursor:
+                cursor.execute(
+                    "SELECT vehicle_type, min_visits, max_visits, credit, discount_percent FROM LoyaltyRules "
+                    "ORDER BY id"
+                )
+                self._rules = tuple(LoyaltyRule(*row) for row in cursor.fetchall())
+            self._loaded_at = time.monotonic()
+        logger.info("Loaded {count} loyalty rule(s).", count=len(self._rules))
+
+    def rules(self):
+        if time.monotonic() - self._loaded_at >= self.refresh_interval:
+            self.reload()
+        return self._rules
+
+    def add_rule(self, vehicle_type, min_visits, max_visits=None, credit=0, discount_percent=0):
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO LoyaltyRules (vehicle_type, min_visits, max_visits, credit, discount_percent) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (vehicle_type, min_visits, max_visits, credit, discount_percent)
+            )
+        self.reload()
+
+    def evaluate(self, vehicle_type, visit_count):
+        """``(credit, discount_percent)`` as Decimals for the ``visit_count``-th visit with ``vehicle_type``."""
+        credit = discount = Decimal(0)
+        for rule in self.rules():
+            if self._matches(rule, vehicle_type, visit_count):
+                credit += Decimal(rule.credit)
+                discount = max(discount, Decimal(rule.discount_percent))
+        return credit, discount
+
+    def discount_basis_points(self, vehicle_types, visit_counts):
+        """Vectorized discount for parallel sequences, in hundredths of a percent."""
+        vehicle_types = np.asarray(vehicle_types, dtype=object)
+        visit_counts = np.asarray(visit_counts, dtype=np.int64)
+        discounts = np.zeros(len(visit_counts), dtype=np.int64)
+        for rule in self.rules():
+            if not rule.discount_percent:
+                continue
+            mask = visit_counts >= rule.min_visits
+            if rule.max_visits is not None:
+                mask &= visit_counts <= rule.max_visits
+            if rule.vehicle_type is not None:
+                mask &= vehicle_types == rule.vehicle_type
+            discounts = np.where(mask, np.maximum(discounts, int(Decimal(rule.discount_percent) * 100)), discounts)
+        return discounts
+
+    def _matches(self, rule, vehicle_type, visit_count):
+        return (visit_count >= rule.min_visits
+                and (rule.max_visits is None or visit_count <= rule.max_visits)
+                and (rule.vehicle_type is None or rule.vehicle_type == vehicle_type))
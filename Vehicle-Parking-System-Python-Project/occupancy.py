@@ -0,0 +1,88 @@
+import threading
+
+from loguru import logger
+from pymysql.cursors import SSCursor
+
+
+class OccupancyTracker:
+    """In-process index of the vehicles currently parked.
+
+    Holds ``plate -> (session id, vehicle type)`` and one counter per vehicle
+    type, so "is this plate inside", "how many 4-wheelers are parked" and
+    capacity checks are dict lookups with no database round-trip. ``load()``
+    rebuilds it from the open ParkingSessions rows in one streaming query;
+    after that VehicleParkingSystem keeps it current on every check-in and
+    check-out. Sessions opened by other processes are only picked up by the
+    next ``load()``.
+
+    ``capacity`` maps vehicle type to the number of bays; types not in it are
+    unlimited.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = dict(capacity or {})
+        self._sessions = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def load(self, pool):
+        sessions, counts = {}, {}
+        with pool.cursor(SSCursor) as cursor:
+            cursor.execute(
+                "SELECT active_plate, id, vehicle_type FROM ParkingSessions WHERE active_plate IS NOT NULL"
+            )
+            for plate, session_id, vehicle_type in cursor:
+                sessions[plate] = (session_id, vehicle_type)
+                counts[vehicle_type] = counts.get(vehicle_type, 0) + 1
+        with self._lock:
+            self._sessions, self._counts = sessions, counts
+        logger.info("Occupancy loaded: {parked} vehicle(s) parked.", parked=len(sessions), counts=counts)
+
+    def reserve(self, plate, vehicle_type):
+        """Claim a bay for ``plate`` before its session is written; False if it is inside or the type is full."""
+        with self._lock:
+            if plate in self._sessions:
+                return False
+            count = self._counts.get(vehicle_type, 0)
+            limit = self.capacity.get(vehicle_type)
+            if limit is not None and count >= limit:
+                return False
+            self._sessions[plate] = (None, vehicle_type)
+            self._counts[vehicle_type] = count + 1
+            return True
+
+    def confirm(self, plate, session_id):
+        with self._lock:
+            entry = self._sessions.get(plate)
+            if entry is not None:
+                self._sessions[plate] = (session_id, entry[1])
+
+    def release(self, plate):
+        with self._lock:
+            entry = self._sessions.pop(plate, None)
+            if entry is not None:
+                self._counts[entry[1]] -= 1
+        return entry is not None
+
+    def is_parked(self, plate):
+        return plate in self._sessions
+
+    def session_id(self, plate):
+        entry = self._sessions.get(plate)
+        return entry[0] if entry else None
+
+    def count(self, vehicle_type=None):
+        if vehicle_type is None:
+            return len(self._sessions)
+        return self._counts.get(vehicle_type, 0)
+
+    def available(self, vehicle_type):
+        """Free bays for ``vehicle_type``, or None when it has no capacity limit."""
+        limit = self.capacity.get(vehicle_type)
+        if limit is None:
+            return None
+        return max(limit - self._counts.get(vehicle_type, 0), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,106 @@
+from collections import namedtuple
+from decimal import Decimal
+
+import numpy as np
+from loguru import logger
+
+Tariff = namedtuple("Tariff", "vehicle_type hourly_rate daily_rate")
+
+DEFAULT_TARIFFS = {
+    '2-wheeler': 20,  # Fee for 2-wheelers (Rs. 20 per day)
+    '4-wheeler': 50,  # Fee for 4-wheelers (Rs. 50 per day)
+    '6-wheeler': 100  # Fee for 6-wheelers (Rs. 100 per day)
+}
+MINUTES_PER_DAY = 24 * 60
+
+
+def create_tariff_tables(cursor):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = 'Tariffs'"
+    )
+    is_new = cursor.fetchone() is None
+    # hourly_rate NULL means every started day is charged at daily_rate; otherwise the last partial day
+    # is charged per started hour, capped at daily_rate.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Tariffs (
+            vehicle_type VARCHAR(50) PRIMARY KEY,
+            hourly_rate DECIMAL(10, 2) NULL,
+            daily_rate DECIMAL(10, 2) NOT NULL
+        )
+    """)
+    if is_new:
+        cursor.executemany(
+            "INSERT INTO Tariffs (vehicle_type, daily_rate) VALUES (%s, %s)", list(DEFAULT_TARIFFS.items())
+        )
+
+
+def to_paise(amount):
+    return int(Decimal(amount).scaleb(2).to_integral_value())
+
+
+def from_paise(paise):
+    return Decimal(int(paise)).scaleb(-2)
+
+
+def paise_array(rates):
+    """Rupee rates as an int64 paise array; None (no rate) becomes -1."""
+    return np.array([-1 if rate is None else to_paise(rate) for rate in rates], dtype=np.int64)
+
+
+def price_paise(minutes, hourly, daily, discount_basis_points=None):
+    """Vectorized fees in paise for stays of ``minutes`` at the given paise rates.
+
+    An hourly rate of -1 means every started day is charged at the daily
+    rate; otherwise the last partial day is charged per started hour, capped
+    at the daily rate. Every stay is charged at least one unit. Discounts are
+    hundredths of a percent, rounded half up to the paisa.
+    """
+    minutes = np.maximum(np.asarray(minutes, dtype=np.int64), 1)
+    full_days, rest = np.divmod(minutes, MINUTES_PER_DAY)
+    by_day = (full_days + (rest > 0)) * daily
+    partial_day = np.minimum(-(-rest // 60) * hourly, daily)
+    fees = np.where(hourly >= 0, full_days * daily + partial_day, by_day)
+    if discount_basis_points is not None:
+        basis_points = np.asarray(discount_basis_points, dtype=np.int64)
+        fees = (fees * (10000 - basis_points) + 5000) // 10000
+    return fees
+
+
+def stay_fees(minutes, hourly_rates, daily_rates, discount_basis_points=None):
+    """``Decimal`` fees for stays priced at explicit rates, such as those frozen on a ParkingSessions row."""
+    fees = price_paise(minutes, paise_array(hourly_rates), paise_array(daily_rates), discount_basis_points)
+    return [from_paise(fee) for fee in fees]
+
+
+class TariffEngine:
+    """In-process cache of the Tariffs table.
+
+    ``get()`` is a dict lookup with no database round-trip. Rates are read
+    from here when a session opens or a vehicle is billed and then stored on
+    that row, and ``stay_fees()`` prices whole batches from the stored rates.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._tariffs = {}
+        self.reload()
+
+    def reload(self):
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT vehicle_type, hourly_rate, daily_rate FROM Tariffs ORDER BY vehicle_type")
+            rows = cursor.fetchall()
+        # Swapped in one assignment, so readers on other threads never see a half-built table.
+        self._tariffs = {row[0]: Tariff(*row) for row in rows}
+        logger.info("Loaded {count} tariff(s).", count=len(self._tariffs))
+
+    def set_tariff(self, vehicle_type, daily_rate, hourly_rate=None):
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO Tariffs (vehicle_type, hourly_rate, daily_rate) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE hourly_rate = VALUES(hourly_rate), daily_rate = VALUES(daily_rate)",
+                (vehicle_type, hourly_rate, daily_rate)
+            )
+        self.reload()
+
+    def get(self, vehicle_type):
+        return self._tariffs.get(vehicle_type)
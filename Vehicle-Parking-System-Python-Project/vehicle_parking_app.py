@@ -1,33 +1,91 @@
-from loguru import logger
+from collections import namedtuple
+
 import pymysql
+from pymysql.constants import ER
+from loguru import logger
+
+from db_pool import LRUCache, ensure_column, ensure_index, get_pool
+from log_config import configure_logging
+from loyalty import LoyaltyRules, VisitResult, create_loyalty_tables
+from occupancy import OccupancyTracker
+from tariff import MINUTES_PER_DAY, TariffEngine, create_tariff_tables, stay_fees
+
+# hourly_rate, daily_rate and discount_bp are frozen when the session opens, so its fee never depends on
+# tariffs or loyalty rules changed later.
+ParkingSession = namedtuple(
+    "ParkingSession",
+    "id customer_id vehicle_number vehicle_type entry_time exit_time parking_days daily_rate total_fee "
+    "hourly_rate discount_bp"
+)
+
+SESSION_COLUMNS = (
+    "id, customer_id, vehicle_number, vehicle_type, entry_time, exit_time, parking_days, daily_rate, total_fee, "
+    "hourly_rate, discount_bp"
+)
+INSERT_SESSION = (
+    "INSERT INTO ParkingSessions (customer_id, vehicle_number, vehicle_type, hourly_rate, daily_rate, discount_bp) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+
+def normalize_phone(phone_number):
+    """Digits only, so "98400 12345" and "98400-12345" are stored and looked up as the same number."""
+    if phone_number is None:
+        return None
+    return "".join(ch for ch in str(phone_number) if ch.isdigit())
+
+
+def _update_by_id(cursor, table, columns, rows, extra="", extra_params=()):
+    """Write per-row values with one UPDATE: ``rows`` are ``(id, *values)`` tuples matching ``columns``.
+
+    ``extra`` is an optional SET clause applied to every row, with its own
+    ``extra_params``.
+    """
+    cases = " ".join(["WHEN %s THEN %s"] * len(rows))
+    assignments = [f"{column} = CASE id {cases} END" for column in columns]
+    if extra:
+        assignments.append(extra)
+    params = []
+    for position in range(1, len(columns) + 1):
+        for row in rows:
+            params.extend((row[0], row[position]))
+    params.extend(extra_params)
+    params.append([row[0] for row in rows])
+    cursor.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE id IN %s", params)
 
 
 class VehicleParkingSystem:
-    def __init__(self, host, user, password, db_name):
+    def __init__(self, host, user, password, db_name, pool_size=10, port=3306, customer_cache_size=4096,
+                 capacity=None, loyalty_refresh_interval=60.0):
         self.db_name = db_name
         self.host = host
         self.user = user
         self.password = password
-        self.db_connection = self.connect_to_db()
-        self.cursor = self.db_connection.cursor()
-        self.create_tables()
-
-    def connect_to_db(self):
-        connection = pymysql.connect(
-            host=self.host, user=self.user, password=self.password
+        self.pool = get_pool(
+            host, user, password, db_name, schema=self.create_tables, max_size=pool_size, port=port
         )
-        cursor = connection.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name}")
-        cursor.execute(f"USE {self.db_name}")
-        connection.commit()
-        return connection
-
-    def create_tables(self):
-        self._create_customers_table()
-        self._create_vehicles_table()
-
-    def _create_customers_table(self):
-        self.cursor.execute("""
+        # (name, normalized phone) -> customer id. Only hits are cached and ids never change, so nothing invalidates.
+        self.customer_ids = LRUCache(maxsize=customer_cache_size)
+        self.tariffs = TariffEngine(self.pool)
+        self.loyalty = LoyaltyRules(self.pool, refresh_interval=loyalty_refresh_interval)
+        self.occupancy = OccupancyTracker(capacity)
+        self.occupancy.load(self.pool)
+
+    def create_tables(self, cursor):
+        self._create_customers_table(cursor)
+        self._add_customer_lookup_index(cursor)
+        self._create_vehicles_table(cursor)
+        self._migrate_vehicle_fee_column(cursor)
+        self._add_vehicle_billing_columns(cursor)
+        self._create_parking_sessions_table(cursor)
+        ensure_column(cursor, "ParkingSessions", "hourly_rate", "DECIMAL(10, 2) NULL")
+        ensure_column(cursor, "ParkingSessions", "discount_bp", "INT NOT NULL DEFAULT 0")
+        self._add_vehicle_plate_index(cursor)
+        create_tariff_tables(cursor)
+        create_loyalty_tables(cursor)
+
+    def _create_customers_table(self, cursor):
+        cursor.execute("""
             CREATE TABLE IF NOT EXISTS Customers (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 name VARCHAR(100),
@@ -36,10 +94,19 @@ class VehicleParkingSystem:
                 visit_count INT DEFAULT 0
             )
         """)
-        self.db_connection.commit()
 
-    def _create_vehicles_table(self):
-        self.cursor.execute("""
+    def _add_customer_lookup_index(self, cursor):
+        # Serves the (name, phone) customer lookups. Rows written before phone numbers were normalized
+        # are cleaned up once, when the index first goes in.
+        if ensure_index(cursor, "Customers", "idx_customers_phone_name", "phone_number, name"):
+            cursor.execute(
+                "UPDATE Customers SET phone_number = REGEXP_REPLACE(phone_number, '[^0-9]', '') "
+                "WHERE phone_number REGEXP '[^0-9]'"
+            )
+            logger.info(f"Normalized {cursor.rowcount} customer phone number(s).")
+
+    def _create_vehicles_table(self, cursor):
+        cursor.execute("""
             CREATE TABLE IF NOT EXISTS Vehicles (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 customer_id INT,
@@ -50,150 +117,537 @@ class VehicleParkingSystem:
                 FOREIGN KEY (customer_id) REFERENCES Customers(id)
             )
         """)
-        self.db_connection.commit()
 
-    def find_customer(self, name, phone_number):
-        self.cursor.execute(
-            "SELECT id FROM Customers WHERE name = %s AND phone_number = %s", (name, phone_number)
+    def _migrate_vehicle_fee_column(self, cursor):
+        # total_fee used to be INT and silently truncated discounted fees.
+        cursor.execute(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = 'Vehicles' AND column_name = 'total_fee'"
         )
-        customer = self.cursor.fetchone()
+        row = cursor.fetchone()
+        if row and row[0].lower() != "decimal":
+            cursor.execute("ALTER TABLE Vehicles MODIFY total_fee DECIMAL(10, 2)")
+            logger.info("Changed Vehicles.total_fee to DECIMAL(10, 2).")
+
+    def _add_vehicle_billing_columns(self, cursor):
+        # The rate and discount a vehicle was billed with, and when. bill_vehicles() only prices rows with
+        # billed_at NULL; fees already on the table when the column first goes in are kept as billed.
+        ensure_column(cursor, "Vehicles", "daily_rate", "DECIMAL(10, 2) NULL")
+        ensure_column(cursor, "Vehicles", "discount_bp", "INT NULL")
+        if ensure_column(cursor, "Vehicles", "billed_at", "DATETIME NULL"):
+            cursor.execute("UPDATE Vehicles SET billed_at = NOW() WHERE total_fee IS NOT NULL")
+
+    @staticmethod
+    def normalize_plate(vehicle_number):
+        """Upper case with no whitespace, so "ka 01 ab 1234" and "KA01AB1234" are the same vehicle."""
+        if vehicle_number is None:
+            return None
+        return "".join(str(vehicle_number).split()).upper()
+
+    def _add_vehicle_plate_index(self, cursor):
+        # Covers vehicle_owners() and replaces the plain plate index. Plates written before
+        # normalize_plate() existed are cleaned up once, when this index first goes in.
+        if ensure_index(cursor, "Vehicles", "idx_vehicles_plate_owner", "vehicle_number, customer_id, vehicle_type"):
+            cursor.execute(
+                "SELECT 1 FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'Vehicles' AND index_name = 'idx_vehicles_number' "
+                "LIMIT 1"
+            )
+            if cursor.fetchone():
+                cursor.execute("DROP INDEX idx_vehicles_number ON Vehicles")
+            self._normalize_stored_plates(cursor)
+
+    def _normalize_stored_plates(self, cursor):
+        # IGNORE leaves an open session alone if the same vehicle is also open under its normalized spelling.
+        normalized = "UPPER(REGEXP_REPLACE(vehicle_number, '[[:space:]]', ''))"
+        for table, ignore in (("Vehicles", ""), ("ParkingSessions", "IGNORE ")):
+            cursor.execute(
+                f"UPDATE {ignore}{table} SET vehicle_number = {normalized} "
+                f"WHERE BINARY vehicle_number <> BINARY {normalized}"
+            )
+            if cursor.rowcount:
+                logger.info(f"Normalized {cursor.rowcount} plate(s) in {table}.")
+
+    def _create_parking_sessions_table(self, cursor):
+        # One row per stay. active_plate is the plate while the session is open and NULL once it is
+        # closed, so its unique index allows any number of past stays but only one open one per plate.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ParkingSessions (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                customer_id INT NULL,
+                vehicle_number VARCHAR(50) NOT NULL,
+                vehicle_type VARCHAR(50) NOT NULL,
+                entry_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                exit_time DATETIME NULL,
+                parking_days INT NULL,
+                daily_rate DECIMAL(10, 2) NOT NULL,
+                total_fee DECIMAL(10, 2) NULL,
+                active_plate VARCHAR(50) AS (IF(exit_time IS NULL, vehicle_number, NULL)) STORED,
+                UNIQUE KEY uq_parking_sessions_active_plate (active_plate),
+                INDEX idx_parking_sessions_plate_entry (vehicle_number, entry_time),
+                FOREIGN KEY (customer_id) REFERENCES Customers(id)
+            )
+        """)
+
+    def find_customer(self, name, phone_number):
+        phone_number = normalize_phone(phone_number)
+        customer_id = self.customer_ids.get((name, phone_number))
+        if customer_id is not None:
+            return customer_id
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM Customers WHERE phone_number = %s AND name = %s ORDER BY id LIMIT 1",
+                (phone_number, name)
+            )
+            customer = cursor.fetchone()
         if customer:
+            self.customer_ids.put((name, phone_number), customer[0])
             return customer[0]  # Return the customer ID
         else:
-            logger.error(f"Customer with Name: {name} and Phone: {phone_number} not found.")
+            logger.error("Customer with Name: {name} and Phone: {phone_number} not found.", name=name,
+                         phone_number=phone_number)
             return None
 
     def register_customer(self, name, phone_number, address):
-        self.cursor.execute(
-            "INSERT INTO Customers (name, phone_number, address) VALUES (%s, %s, %s)",
-            (name, phone_number, address)
-        )
-        self.db_connection.commit()
-        customer_id = self.cursor.lastrowid
-        logger.info(f"Customer registered: {name}, Phone: {phone_number}")
+        phone_number = normalize_phone(phone_number)
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO Customers (name, phone_number, address) VALUES (%s, %s, %s)",
+                (name, phone_number, address)
+            )
+            customer_id = cursor.lastrowid
+        logger.info("Customer registered: {name}, Phone: {phone_number}", customer_id=customer_id, name=name,
+                    phone_number=phone_number)
         return customer_id
 
     def register_vehicle(self, customer_id, vehicle_number, vehicle_type):
+        vehicle_number = self.normalize_plate(vehicle_number)
         if vehicle_type not in ['2-wheeler', '4-wheeler', '6-wheeler']:
-            logger.error(f"Invalid vehicle type: {vehicle_type}. Only 2, 4, and 6 wheelers are allowed.")
+            logger.error("Invalid vehicle type: {vehicle_type}. Only 2, 4, and 6 wheelers are allowed.",
+                         vehicle_type=vehicle_type)
             return None
 
         # Check if the vehicle number already exists for the same customer
-        self.cursor.execute(
-            "SELECT customer_id FROM Vehicles WHERE vehicle_number = %s", (vehicle_number,)
-        )
-        existing_vehicle = self.cursor.fetchone()
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT customer_id FROM Vehicles WHERE vehicle_number = %s", (vehicle_number,)
+            )
+            existing_vehicle = cursor.fetchone()
 
         if existing_vehicle:
             if existing_vehicle[0] == customer_id:
-                logger.error(f"Vehicle with number {vehicle_number} already registered for this customer.")
+                logger.error("Vehicle with number {vehicle_number} already registered for this customer.",
+                             vehicle_number=vehicle_number)
                 return vehicle_number
             else:
-                logger.info(f"Vehicle number {vehicle_number} already registered for another customer.")
+                logger.info("Vehicle number {vehicle_number} already registered for another customer.",
+                            vehicle_number=vehicle_number)
                 # Optionally, apply credits for the existing customer, or just return
                 return vehicle_number
 
         fee = self.get_parking_fee(vehicle_type)
         if fee == -1:
-            logger.error(f"No fee available for vehicle type: {vehicle_type}")
+            logger.error("No fee available for vehicle type: {vehicle_type}", vehicle_type=vehicle_type)
             return None
 
-        self.cursor.execute(
-            "INSERT INTO Vehicles (customer_id, vehicle_number, vehicle_type, parking_duration_days, total_fee) VALUES (%s, %s, %s, %s, %s)",
-            (customer_id, vehicle_number, vehicle_type, 1, fee)  # Default parking duration is 1 day
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO Vehicles (customer_id, vehicle_number, vehicle_type, parking_duration_days, total_fee) VALUES (%s, %s, %s, %s, %s)",
+                (customer_id, vehicle_number, vehicle_type, 1, fee)  # Default parking duration is 1 day
+            )
+        logger.info(
+            "Vehicle registered: {vehicle_number}, Type: {vehicle_type}, Fee: {fee}",
+            customer_id=customer_id, vehicle_number=vehicle_number, vehicle_type=vehicle_type, fee=fee,
+            sample="vehicle_registered"
         )
-        self.db_connection.commit()
-        logger.info(f"Vehicle registered: {vehicle_number}, Type: {vehicle_type}, Fee: {fee}")
         return vehicle_number
 
+    def check_in(self, customer_id, vehicle_number, vehicle_type):
+        """Open a parking session and return its id.
+
+        Returns None if the type is unknown, the plate is already in, or every
+        bay for the type is taken; the last two are answered by the occupancy
+        tracker before any database work. The check-in counts as a visit in
+        the same transaction, and the current rates and the discount that
+        visit earns are stored on the session.
+        """
+        vehicle_number = self.normalize_plate(vehicle_number)
+        if self.tariffs.get(vehicle_type) is None:
+            logger.error("No fee available for vehicle type: {vehicle_type}", vehicle_type=vehicle_type)
+            return None
+        reserved = self.occupancy.reserve(vehicle_number, vehicle_type)
+        if (not reserved and self.occupancy.session_id(vehicle_number) is not None
+                and self.active_session(vehicle_number) is None):
+            # Checked out by another process since the tracker was loaded.
+            self.occupancy.release(vehicle_number)
+            reserved = self.occupancy.reserve(vehicle_number, vehicle_type)
+        if not reserved:
+            if self.occupancy.is_parked(vehicle_number):
+                logger.error("Vehicle {vehicle_number} is already checked in.", vehicle_number=vehicle_number)
+            else:
+                logger.error("No free bay for {vehicle_type}.", vehicle_type=vehicle_type)
+            return None
+        try:
+            with self.pool.cursor() as cursor:
+                visit_count = self._count_visit(cursor, customer_id)
+                discounts = self.loyalty.discount_basis_points([vehicle_type], [visit_count])
+                [row] = self._session_rows([(customer_id, vehicle_number, vehicle_type)], discounts)
+                cursor.execute(INSERT_SESSION, row)
+                session_id = cursor.lastrowid
+        except pymysql.IntegrityError as exc:
+            self.occupancy.release(vehicle_number)
+            if exc.args[0] != ER.DUP_ENTRY:
+                raise
+            logger.error("Vehicle {vehicle_number} is already checked in.", vehicle_number=vehicle_number)
+            return None
+        except Exception:
+            self.occupancy.release(vehicle_number)
+            raise
+        self.occupancy.confirm(vehicle_number, session_id)
+        logger.info("Vehicle {vehicle_number} checked in, session {session_id}.", customer_id=customer_id,
+                    vehicle_number=vehicle_number, session_id=session_id, sample="check_in")
+        return session_id
+
+    def check_out(self, vehicle_number):
+        """Close the open session of ``vehicle_number`` and return it as a ``ParkingSession``, or None.
+
+        The session is locked, priced from its stored rates and discount, and
+        closed in one transaction; ``bill_sessions()`` computes the same fee.
+        """
+        vehicle_number = self.normalize_plate(vehicle_number)
+        with self.pool.cursor() as cursor:
+            sessions = self._close_sessions(cursor, "active_plate = %s", (vehicle_number,))
+        self.occupancy.release(vehicle_number)
+        if not sessions:
+            logger.error("Vehicle {vehicle_number} is not checked in.", vehicle_number=vehicle_number)
+            return None
+        session = sessions[0]
+        logger.info(
+            "Vehicle {vehicle_number} checked out after {days} day(s), fee Rs. {fee}",
+            customer_id=session.customer_id, session_id=session.id, vehicle_number=vehicle_number,
+            days=session.parking_days, fee=session.total_fee, sample="check_out"
+        )
+        return session
+
+    def check_in_batch(self, entries):
+        """Open sessions for many ``(customer_id, vehicle_number, vehicle_type)`` entries in one transaction.
+
+        Returns ``{vehicle_number: session_id}`` for the sessions opened.
+        Entries with an unknown type, a plate already inside or no free bay
+        are skipped. The rows go in as one multi-row INSERT; if another
+        process checked one of the plates in meanwhile, only that statement
+        is rolled back and the rows are retried one by one. Each session
+        opened counts as a visit in the same transaction, and the discount
+        that visit earns is then written to it.
+        """
+        accepted = []
+        for customer_id, vehicle_number, vehicle_type in entries:
+            vehicle_number = self.normalize_plate(vehicle_number)
+            if self.tariffs.get(vehicle_type) is not None and self.occupancy.reserve(vehicle_number, vehicle_type):
+                accepted.append((customer_id, vehicle_number, vehicle_type))
+        if not accepted:
+            return {}
+        plates = [entry[1] for entry in accepted]
+        try:
+            with self.pool.cursor() as cursor:
+                rows = self._session_rows(accepted, [0] * len(accepted))
+                try:
+                    cursor.executemany(INSERT_SESSION, rows)
+                    inserted = set(plates)
+                except pymysql.IntegrityError as exc:
+                    if exc.args[0] != ER.DUP_ENTRY:
+                        raise
+                    inserted = set()
+                    for row in rows:
+                        try:
+                            cursor.execute(INSERT_SESSION, row)
+                            inserted.add(row[1])
+                        except pymysql.IntegrityError as exc:
+                            if exc.args[0] != ER.DUP_ENTRY:
+                                raise
+                cursor.execute("SELECT active_plate, id FROM ParkingSessions WHERE active_plate IN %s", (plates,))
+                active = dict(cursor.fetchall())
+                opened = [entry for entry in accepted if entry[1] in inserted and entry[1] in active]
+                if opened:
+                    visit_counts = [self._count_visit(cursor, entry[0]) for entry in opened]
+                    discounts = self.loyalty.discount_basis_points([entry[2] for entry in opened], visit_counts)
+                    _update_by_id(cursor, "ParkingSessions", ("discount_bp",),
+                                  [(active[entry[1]], int(discount)) for entry, discount in zip(opened, discounts)])
+        except Exception:
+            for plate in plates:
+                self.occupancy.release(plate)
+            raise
+        for plate in plates:
+            # Plates another process checked in are inside too, under that process's session.
+            if plate in active:
+                self.occupancy.confirm(plate, active[plate])
+            else:
+                self.occupancy.release(plate)
+        opened = {entry[1]: active[entry[1]] for entry in opened}
+        logger.info("Checked in {count} of {requested} vehicle(s).", count=len(opened), requested=len(accepted),
+                    sample="check_in_batch")
+        return opened
+
+    def check_out_batch(self, vehicle_numbers):
+        """Close the open sessions of many plates in one transaction and return them as ``ParkingSession``s.
+
+        Plates without an open session are skipped.
+        """
+        plates = list(dict.fromkeys(self.normalize_plate(plate) for plate in vehicle_numbers))
+        if not plates:
+            return []
+        with self.pool.cursor() as cursor:
+            sessions = self._close_sessions(cursor, "active_plate IN %s", (plates,))
+        for plate in plates:
+            self.occupancy.release(plate)
+        logger.info("Checked out {count} of {requested} vehicle(s).", count=len(sessions), requested=len(plates),
+                    sample="check_out_batch")
+        return sessions
+
+    def _session_rows(self, entries, discounts):
+        """INSERT_SESSION rows for ``(customer_id, vehicle_number, vehicle_type)`` entries of known types.
+
+        Each row carries the current hourly and daily rate and the entry's
+        discount in basis points.
+        """
+        rows = []
+        for (customer_id, vehicle_number, vehicle_type), discount in zip(entries, discounts):
+            tariff = self.tariffs.get(vehicle_type)
+            rows.append((customer_id, vehicle_number, vehicle_type, tariff.hourly_rate, tariff.daily_rate,
+                         int(discount)))
+        return rows
+
+    def _count_visit(self, cursor, customer_id):
+        """Add one visit inside the caller's transaction and return the new count (0 for no such customer).
+
+        LAST_INSERT_ID(expr) hands the incremented value back with the
+        UPDATE's reply, so concurrent check-ins never lose a visit and no
+        separate read is needed.
+        """
+        if customer_id is None:
+            return 0
+        cursor.execute(
+            "UPDATE Customers SET visit_count = LAST_INSERT_ID(COALESCE(visit_count, 0) + 1) WHERE id = %s",
+            (customer_id,)
+        )
+        return cursor.lastrowid if cursor.rowcount else 0
+
+    def _close_sessions(self, cursor, where, params):
+        """Lock the open sessions matching ``where``, price them and close them; returns the closed sessions.
+
+        Every started day counts towards ``parking_days``, with a one-day
+        minimum. The fee uses the rates and discount stored at check-in and the
+        duration in whole minutes, exactly as ``bill_sessions()`` does.
+        """
+        cursor.execute(
+            "SELECT id, NOW(), GREATEST(TIMESTAMPDIFF(SECOND, entry_time, NOW()), 0), hourly_rate, daily_rate, "
+            f"discount_bp FROM ParkingSessions WHERE {where} AND exit_time IS NULL FOR UPDATE",
+            params
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+        ids, exit_times, seconds, hourly_rates, daily_rates, discounts = zip(*rows)
+        fees = stay_fees([elapsed // 60 for elapsed in seconds], hourly_rates, daily_rates, discounts)
+        days = [max(1, -(-elapsed // 86400)) for elapsed in seconds]
+        _update_by_id(cursor, "ParkingSessions", ("parking_days", "total_fee"), list(zip(ids, days, fees)),
+                      "exit_time = %s", (exit_times[0],))
+        cursor.execute(f"SELECT {SESSION_COLUMNS} FROM ParkingSessions WHERE id IN %s", (ids,))
+        return [ParkingSession(*row) for row in cursor.fetchall()]
+
+    def vehicle_owners(self, vehicle_numbers):
+        """``{vehicle_number: (customer_id, vehicle_type)}`` for the registered plates among ``vehicle_numbers``.
+
+        Keys are the normalized plates (see ``normalize_plate()``).
+        """
+        plates = list(dict.fromkeys(self.normalize_plate(plate) for plate in vehicle_numbers))
+        if not plates:
+            return {}
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT vehicle_number, customer_id, vehicle_type FROM Vehicles WHERE vehicle_number IN %s",
+                (plates,)
+            )
+            return {plate: (customer_id, vehicle_type) for plate, customer_id, vehicle_type in cursor.fetchall()}
+
+    def get_session(self, session_id):
+        with self.pool.cursor() as cursor:
+            cursor.execute(f"SELECT {SESSION_COLUMNS} FROM ParkingSessions WHERE id = %s", (session_id,))
+            row = cursor.fetchone()
+        return ParkingSession(*row) if row else None
+
+    def session_fee(self, session_id):
+        """Fee of a closed session, or None while it is still open."""
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT total_fee FROM ParkingSessions WHERE id = %s", (session_id,))
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def active_session(self, vehicle_number):
+        vehicle_number = self.normalize_plate(vehicle_number)
+        with self.pool.cursor() as cursor:
+            cursor.execute(f"SELECT {SESSION_COLUMNS} FROM ParkingSessions WHERE active_plate = %s", (vehicle_number,))
+            row = cursor.fetchone()
+        return ParkingSession(*row) if row else None
+
     def get_parking_fee(self, vehicle_type):
-        fees = {
-            '2-wheeler': 20,  # Fee for 2-wheelers (Rs. 20)
-            '4-wheeler': 50,  # Fee for 4-wheelers (Rs. 50)
-            '6-wheeler': 100  # Fee for 6-wheelers (Rs. 100)
-        }
-        return fees.get(vehicle_type, -1)
+        tariff = self.tariffs.get(vehicle_type)
+        return tariff.daily_rate if tariff else -1
 
     def update_parking_duration(self, vehicle_number, duration):
-        self.cursor.execute(
-            "UPDATE Vehicles SET parking_duration_days = %s WHERE vehicle_number = %s", (duration, vehicle_number)
-        )
-        self.db_connection.commit()
-        logger.info(f"Parking duration updated for vehicle Number: {vehicle_number}, Duration: {duration} day(s)")
+        # A new duration needs a new bill, at the rate and discount the vehicle was first billed with.
+        vehicle_number = self.normalize_plate(vehicle_number)
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "UPDATE Vehicles SET parking_duration_days = %s, billed_at = NULL WHERE vehicle_number = %s",
+                (duration, vehicle_number)
+            )
+        logger.info("Parking duration updated for vehicle Number: {vehicle_number}, Duration: {duration} day(s)",
+                    vehicle_number=vehicle_number, duration=duration)
 
     def calculate_total_fee(self, vehicle_number, apply_discount=False):
+        vehicle_number = self.normalize_plate(vehicle_number)
         # Query for the vehicle type and parking duration
-        self.cursor.execute("SELECT vehicle_type, parking_duration_days FROM Vehicles WHERE vehicle_number = %s", (vehicle_number,))
-        vehicle = self.cursor.fetchone()
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT v.vehicle_type, v.parking_duration_days, COALESCE(c.visit_count, 0) "
+                "FROM Vehicles v LEFT JOIN Customers c ON c.id = v.customer_id WHERE v.vehicle_number = %s",
+                (vehicle_number,)
+            )
+            vehicle = cursor.fetchone()
 
         if not vehicle:
-            logger.error(f"Vehicle Number {vehicle_number} not found!")
+            logger.error("Vehicle Number {vehicle_number} not found!", vehicle_number=vehicle_number)
             return None
 
-        # Unpack vehicle data
-        print("1")
-        vehicle_type, parking_duration = vehicle
-        print("2")
-
-        # Get the parking fee for the vehicle type
-        fee = self.get_parking_fee(vehicle_type)
-        if fee == -1:
-            logger.error(f"Invalid vehicle type: {vehicle_type}. Fee not found.")
+        vehicle_type, parking_duration, visit_count = vehicle
+        tariff = self.tariffs.get(vehicle_type)
+        if tariff is None:
+            logger.error("Invalid vehicle type: {vehicle_type}. Fee not found.", vehicle_type=vehicle_type)
             return None
+        discount = self.loyalty.evaluate(vehicle_type, visit_count)[1] if apply_discount else 0
+        discount_bp = int(discount * 100)
+        total_fee = stay_fees([(parking_duration or 1) * MINUTES_PER_DAY], [None], [tariff.daily_rate],
+                              [discount_bp])[0]
+        if apply_discount:
+            logger.info("Discount applied. New total fee: Rs. {total_fee}", total_fee=total_fee)
+
+        # Update the total fee in the database, with the rate and discount it was billed at
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                "UPDATE Vehicles SET total_fee = %s, daily_rate = %s, discount_bp = %s, billed_at = NOW() "
+                "WHERE vehicle_number = %s",
+                (total_fee, tariff.daily_rate, discount_bp, vehicle_number)
+            )
+        logger.info("Total fee calculated for vehicle ID: {vehicle_number}, Total fee: Rs. {total_fee}",
+                    vehicle_number=vehicle_number, total_fee=total_fee)
 
-        # Calculate total fee
-        total_fee = fee * parking_duration
+        return total_fee
 
-        # Apply discount if applicable
-        if apply_discount:
-            total_fee *= 0.9  # 10% discount for next visit
-            logger.info(f"Discount applied. New total fee: Rs. {total_fee}")
+    def bill_vehicles(self, chunk_size=5000):
+        """Price every unbilled vehicle (``billed_at`` NULL) and mark it billed.
+
+        A vehicle billed before keeps the daily rate and discount stored then;
+        one never billed gets the current tariff and the discount its
+        customer's visit count earns now, and both are stored with the fee.
+        Already billed vehicles are never re-priced. Rows are priced in one
+        vectorized pass and written with one UPDATE per chunk. Returns the
+        number of vehicles billed.
+        """
+        return self._bill(
+            "SELECT v.id, v.vehicle_type, COALESCE(v.parking_duration_days, 1), COALESCE(c.visit_count, 0), "
+            "v.daily_rate, v.discount_bp FROM Vehicles v LEFT JOIN Customers c ON c.id = v.customer_id "
+            "WHERE v.billed_at IS NULL AND v.id > %s ORDER BY v.id LIMIT %s",
+            (), "Vehicles", ("total_fee", "daily_rate", "discount_bp"), self._price_vehicles, chunk_size,
+            extra="billed_at = NOW()"
+        )
 
-        # Update the total fee in the database
-        self.cursor.execute("UPDATE Vehicles SET total_fee = %s WHERE vehicle_number = %s", (total_fee, vehicle_number))
-        self.db_connection.commit()
-        logger.info(f"Total fee calculated for vehicle ID: {vehicle_number}, Total fee: Rs. {total_fee}")
+    def bill_sessions(self, start, end, chunk_size=5000):
+        """Re-price the sessions that ended in ``[start, end)`` from the rates and discount stored on each.
+
+        Meant for nightly billing; it yields the fee ``check_out()`` charged,
+        so it only corrects rows written by older versions. Returns the number
+        of sessions billed.
+        """
+        return self._bill(
+            "SELECT id, TIMESTAMPDIFF(MINUTE, entry_time, exit_time), hourly_rate, daily_rate, discount_bp "
+            "FROM ParkingSessions WHERE exit_time >= %s AND exit_time < %s AND id > %s ORDER BY id LIMIT %s",
+            (start, end), "ParkingSessions", ("total_fee",), self._price_sessions, chunk_size
+        )
 
-        return total_fee
+    def _price_vehicles(self, rows):
+        rows = [row for row in rows if row[4] is not None or self.tariffs.get(row[1]) is not None]
+        if not rows:
+            return []
+        ids, vehicle_types, days, visit_counts, daily_rates, discounts = zip(*rows)
+        current = self.loyalty.discount_basis_points(vehicle_types, visit_counts)
+        discounts = [int(now) if stored is None else stored for stored, now in zip(discounts, current)]
+        daily_rates = [self.tariffs.get(vehicle_type).daily_rate if rate is None else rate
+                       for vehicle_type, rate in zip(vehicle_types, daily_rates)]
+        fees = stay_fees([day * MINUTES_PER_DAY for day in days], [None] * len(ids), daily_rates, discounts)
+        return list(zip(ids, fees, daily_rates, discounts))
+
+    def _price_sessions(self, rows):
+        ids, minutes, hourly_rates, daily_rates, discounts = zip(*rows)
+        fees = stay_fees(minutes, hourly_rates, daily_rates, discounts)
+        return list(zip(ids, fees))
+
+    def _bill(self, query, params, table, columns, price, chunk_size, extra=""):
+        billed = 0
+        last_id = 0
+        while True:
+            with self.pool.cursor() as cursor:
+                cursor.execute(query, (*params, last_id, chunk_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                priced = price(rows)
+                if priced:
+                    _update_by_id(cursor, table, columns, priced, extra)
+                billed += len(priced)
+            last_id = rows[-1][0]
+            if len(rows) < chunk_size:
+                break
+        logger.info("Billed {count} row(s) in {table}.", count=billed, table=table)
+        return billed
+
+    def record_visit(self, customer_id, vehicle_type):
+        """Count a visit and return a ``VisitResult`` with the credit and discount it earns, or None.
+
+        The increment happens in the database and LAST_INSERT_ID(expr) hands
+        the new count back with the UPDATE's reply, so concurrent gate events
+        never lose a visit and the rules come from the in-process cache.
+        """
+        with self.pool.cursor() as cursor:
+            visit_count = self._count_visit(cursor, customer_id)
+        if not visit_count:
+            logger.error("Customer ID {customer_id} not found.", customer_id=customer_id)
+            return None
+        credit, discount = self.loyalty.evaluate(vehicle_type, visit_count)
+        logger.info(
+            "Customer ID {customer_id} now has {visit_count} visits. Credit: Rs. {credit}, discount: {discount}%",
+            customer_id=customer_id, visit_count=visit_count, credit=credit, discount=discount, sample="visit"
+        )
+        return VisitResult(customer_id, visit_count, credit, discount)
 
     def add_visit_and_credit(self, customer_id, vehicle_type):
-        # Get current visit count and increase it by 1
-        self.cursor.execute("SELECT visit_count FROM Customers WHERE id = %s", (customer_id,))
-        result = self.cursor.fetchone()
-        if result:
-            visit_count = result[0] + 1
-            self.cursor.execute("UPDATE Customers SET visit_count = %s WHERE id = %s", (visit_count, customer_id))
-            self.db_connection.commit()
-            logger.info(f"Customer ID {customer_id} now has {visit_count} visits.")
-
-            # Add credit based on vehicle type and visits
-            credit = 0
-            if visit_count == 1:
-                if vehicle_type == '2-wheeler':
-                    credit = 10
-                elif vehicle_type == '4-wheeler':
-                    credit = 20
-                elif vehicle_type == '6-wheeler':
-                    credit = 30
-                logger.info(f"Credit added for vehicle type {vehicle_type}: Rs. {credit}")
-                return credit
-            else:
-                logger.info(f"Customer has visited {visit_count} times, no credit added.")
-                return 0
-        return 0
+        visit = self.record_visit(customer_id, vehicle_type)
+        return visit.credit if visit else 0
 
-    def apply_discount_on_next_visit(self, customer_id):
+    def apply_discount_on_next_visit(self, customer_id, vehicle_type=None):
         # Check visit count and apply discount for the next visit
-        self.cursor.execute("SELECT visit_count FROM Customers WHERE id = %s", (customer_id,))
-        result = self.cursor.fetchone()
-        if result and result[0] > 1:
-            logger.info(f"Discount will be applied on next visit for customer {customer_id}.")
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT visit_count FROM Customers WHERE id = %s", (customer_id,))
+            result = cursor.fetchone()
+        if result and self.loyalty.evaluate(vehicle_type, result[0] or 0)[1] > 0:
+            logger.info("Discount will be applied on next visit for customer {customer_id}.", customer_id=customer_id)
             return True  # Apply discount logic here
         return False
 
 
 # Main function for interaction
 if __name__ == "__main__":
+    configure_logging()
     logger.info("Welcome to the Vehicle Parking System")
 
     # Get database connection details from the user
@@ -223,15 +677,15 @@ if __name__ == "__main__":
     vehicle_number = parking_system.register_vehicle(customer_id, vehicle_number, vehicle_type)
 
     if vehicle_number:
-        # Add visit count and credit
-        credit = parking_system.add_visit_and_credit(customer_id, vehicle_type)
+        # Count the visit; the reply carries the credit and discount it earns
+        visit = parking_system.record_visit(customer_id, vehicle_type)
 
         # Update parking duration if needed
         duration = int(input("Enter parking duration in days: "))
         parking_system.update_parking_duration(vehicle_number, duration)
 
         # Calculate total fee and apply discount if needed
-        apply_discount = parking_system.apply_discount_on_next_visit(customer_id)
+        apply_discount = bool(visit and visit.discount_percent)
         total_fee = parking_system.calculate_total_fee(vehicle_number, apply_discount)
 
         # Log the final parking bill
@@ -0,0 +1,290 @@
+"""Throughput and latency benchmark for the MySQL-backed apps.
+
+Drives ATMSystem, MyHotel and VehicleParkingSystem from 1..N concurrent
+client threads and reports ops/sec plus p50/p99 latency per scenario as JSON.
+
+Either point it at an existing server (``--host``/``--user``/``--password``)
+or pass ``--local-mysqld`` to start a throwaway ``mysqld`` from PATH on a
+temporary data directory, with no container needed. Benchmark databases are
+created with a ``bench_`` prefix and dropped afterwards.
+
+    python benchmarks/db_apps_benchmark.py --local-mysqld --clients 1 4 16 --output bench.json
+    python benchmarks/db_apps_benchmark.py --host db --password secret --baseline bench.json
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for project in ("ATM-Management-System-Python-Project", "Hotel-Management-System-Python-Project",
+                "Vehicle-Parking-System-Python-Project"):
+    sys.path.insert(0, os.path.join(ROOT, project))
+
+import pymysql  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from atm_app import ATMSystem  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+from hotel_billing_app import MyHotel  # noqa: E402
+from pin_hash import DEFAULT_PIN_ITERATIONS  # noqa: E402
+from vehicle_parking_app import VehicleParkingSystem  # noqa: E402
+
+
+class LocalMySQL:
+    """Start a private mysqld on a temporary data directory and port."""
+
+    def __init__(self, mysqld="mysqld"):
+        self.mysqld = shutil.which(mysqld)
+        if self.mysqld is None:
+            raise RuntimeError(f"{mysqld} not found on PATH; pass --host to use an existing server.")
+        self.datadir = None
+        self.process = None
+        self.port = None
+
+    def __enter__(self):
+        self.datadir = tempfile.mkdtemp(prefix="bench-mysql-")
+        data = os.path.join(self.datadir, "data")
+        subprocess.run(
+            [self.mysqld, "--no-defaults", "--initialize-insecure", f"--datadir={data}"],
+            check=True, capture_output=True
+        )
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.process = subprocess.Popen(
+            [self.mysqld, "--no-defaults", f"--datadir={data}", f"--port={self.port}", "--bind-address=127.0.0.1",
+             f"--socket={os.path.join(self.datadir, 'mysql.sock')}", "--mysqlx=OFF"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                pymysql.connect(host="127.0.0.1", port=self.port, user="root").close()
+                return self
+            except pymysql.Error:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.__exit__(None, None, None)
+                    raise RuntimeError("Local mysqld did not start.")
+                time.sleep(0.5)
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=60)
+        shutil.rmtree(self.datadir, ignore_errors=True)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(operation, clients, ops_per_client):
+    """Run ``operation(client, i)`` from ``clients`` threads; return throughput and latency stats."""
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    start_gate = threading.Barrier(clients + 1)
+
+    def client_loop(client):
+        start_gate.wait()
+        record = latencies[client].append
+        for i in range(ops_per_client):
+            began = time.perf_counter()
+            try:
+                operation(client, i)
+            except Exception:
+                errors[client] += 1
+                continue
+            record(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=client_loop, args=(client,)) for client in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    samples = sorted(itertools.chain.from_iterable(latencies))
+    return {
+        "clients": clients,
+        "ops": len(samples),
+        "errors": sum(errors),
+        "seconds": round(elapsed, 4),
+        "ops_per_sec": round(len(samples) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3) if samples else None,
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3) if samples else None,
+    }
+
+
+def build_scenarios(connection, max_clients, pin_iterations=DEFAULT_PIN_ITERATIONS):
+    """Create the apps on fresh databases and return ``{name: operation(client, i)}``.
+
+    Logins hash PINs at ``pin_iterations`` PBKDF2 rounds; any cost other than
+    the production default is benchmarked under a name that says so, so the
+    two never get compared against each other.
+    """
+    host, port, user, password = connection
+    run_id = uuid.uuid4().hex[:8]
+    pool_size = max_clients + 2
+    atm = ATMSystem(host, user, password, f"bench_atm_{run_id}", pool_size=pool_size, port=port,
+                    pin_iterations=pin_iterations)
+    hotel = MyHotel(host, user, password, f"bench_hotel_{run_id}", pool_size=pool_size, port=port)
+    parking = VehicleParkingSystem(host, user, password, f"bench_parking_{run_id}", pool_size=pool_size, port=port)
+
+    accounts = []
+    for client in range(max_clients):
+        phone_number = f"9000{client:06d}"
+        user_id, account_number = atm.create_user(
+            f"Bench {client}", phone_number, "1234", "Other", "1990-01-01", "Benchmark"
+        )
+        atm.post_transaction(user_id, 'Deposit', 10 ** 7)
+        accounts.append((user_id, account_number))
+    hotel_customers = [
+        hotel.create_customer(f"Bench {c}", "Bench Street", f"90000{c:05d}") for c in range(max_clients)
+    ]
+    parking_customers = [
+        parking.register_customer(f"Bench {c}", f"80000{c:05d}", "Bench Street") for c in range(max_clients)
+    ]
+    plates = itertools.count()
+
+    def login(client, i):
+        account_number = accounts[client][1]
+        atm.logout(account_number)
+        if atm.authenticate_user(account_number, "1234") is None:
+            raise RuntimeError("login failed")
+
+    def deposit(client, i):
+        atm.deposit(accounts[client][0], 100)
+
+    def withdraw(client, i):
+        if not atm.withdraw(accounts[client][0], 1):
+            raise RuntimeError("withdraw rejected")
+
+    def place_order(client, i):
+        hotel.checkout(hotel_customers[client], "Breakfast", {"Dosa": 2, "Idly": 3, "Vada": 1})
+
+    def register_vehicle(client, i):
+        parking.register_vehicle(parking_customers[client], f"BENCH-{run_id}-{next(plates)}", "4-wheeler")
+
+    login_name = "atm_login" if pin_iterations == DEFAULT_PIN_ITERATIONS else f"atm_login_pbkdf2_{pin_iterations}"
+    scenarios = {
+        login_name: login,
+        "atm_deposit": deposit,
+        "atm_withdraw": withdraw,
+        "hotel_order": place_order,
+        "parking_register_vehicle": register_vehicle,
+    }
+    databases = [atm.db_name, hotel.db_name, parking.db_name]
+    return scenarios, databases, atm
+
+
+def drop_databases(connection, databases):
+    host, port, user, password = connection
+    conn = pymysql.connect(host=host, port=port, user=user, password=password)
+    try:
+        with conn.cursor() as cursor:
+            for db_name in databases:
+                cursor.execute(f"DROP DATABASE IF EXISTS `{db_name}`")
+    finally:
+        conn.close()
+
+
+def compare(results, baseline_path, threshold):
+    """Return regression messages for scenarios whose ops/sec fell more than ``threshold`` below baseline."""
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    previous = {(r["scenario"], r["clients"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["clients"]))
+        if not before or not before["ops_per_sec"] or result["ops_per_sec"] is None:
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        if change < -threshold:
+            regressions.append(
+                f"{result['scenario']} @ {result['clients']} clients: "
+                f"{before['ops_per_sec']} -> {result['ops_per_sec']} ops/sec ({change:+.1%})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("BENCH_DB_PASSWORD", ""))
+    parser.add_argument("--local-mysqld", action="store_true", help="Start a throwaway mysqld from PATH.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--ops", type=int, default=200, help="Operations per client per scenario.")
+    parser.add_argument("--scenario", action="append", help="Only run the named scenario(s).")
+    parser.add_argument("--pin-iterations", type=int, default=DEFAULT_PIN_ITERATIONS,
+                        help="PBKDF2 rounds for the login scenario (default: the production cost).")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--baseline", help="Previous JSON report to compare ops/sec against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed ops/sec drop before failing.")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    with contextlib.ExitStack() as stack:
+        if args.local_mysqld:
+            server = stack.enter_context(LocalMySQL())
+            args.host, args.port, args.user, args.password = "127.0.0.1", server.port, "root", ""
+        connection = (args.host, args.port, args.user, args.password)
+        scenarios, databases, atm = build_scenarios(connection, max(args.clients), args.pin_iterations)
+        results = []
+        try:
+            for name, operation in scenarios.items():
+                if args.scenario and name not in args.scenario:
+                    continue
+                for clients in args.clients:
+                    stats = run_scenario(operation, clients, args.ops)
+                    stats["scenario"] = name
+                    results.append(stats)
+                    print(f"{name:28} clients={clients:<4} {stats['ops_per_sec']:>10} ops/s "
+                          f"p50={stats['p50_ms']} ms p99={stats['p99_ms']} ms errors={stats['errors']}",
+                          file=sys.stderr)
+        finally:
+            atm.close()
+            close_pools()
+            drop_databases(connection, databases)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "ops_per_client": args.ops,
+        "pin_iterations": args.pin_iterations,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()